@@ -1,45 +1,40 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import os
 from werkzeug.security import generate_password_hash, check_password_hash
-from engagement import engagement_bp
-from support import support_bp
-from dashboard import dashboard_bp
 from dotenv import load_dotenv
+from lazy import Lazy
 
-# Load environment variables
+# Load environment variables once, before the blueprints read their configuration
 load_dotenv()
 
-# Create Flask application
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key')
+from engagement import engagement_bp
+from support import support_bp
+from dashboard import dashboard_bp
+import circuit_breaker
+import metrics
+import logging_setup
+import shared_state  # Registers the sqlite:// rate-limit storage
 
 # Configure Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Configure rate limiter
+# Configure rate limiter; bound to the application in create_app
 limiter = Limiter(
-    app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"]
 )
 
-# Register blueprints
-app.register_blueprint(engagement_bp, url_prefix='/engagement')
-app.register_blueprint(support_bp, url_prefix='/support')
-app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
-
-# Mock user database
-users = {
+# Mock user database, hashed on first login since password hashing is deliberately slow
+users = Lazy(lambda: {
     'admin@example.com': {
         'password': generate_password_hash('admin123'),
         'id': 1
     }
-}
+})
 
 class User(UserMixin):
     def __init__(self, user_id):
@@ -49,61 +44,94 @@ class User(UserMixin):
 def load_user(user_id):
     return User(user_id)
 
-@app.route('/')
 def home():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
     return redirect(url_for('login'))
 
-@app.route('/login', methods=['GET', 'POST'])
 @limiter.limit("10 per minute")
 def login():
     if request.method == 'POST':
         email = request.form.get('email')
         password = request.form.get('password')
         
-        if email in users and check_password_hash(users[email]['password'], password):
-            user = User(users[email]['id'])
+        if email in users() and check_password_hash(users()[email]['password'], password):
+            user = User(users()[email]['id'])
             login_user(user)
             return redirect(url_for('index'))
         
         flash('Invalid email or password')
     return render_template('account.html')
 
-@app.route('/index')
 @login_required
 def index():
     return render_template('index.html')
 
-@app.route('/logout')
 @login_required
 def logout():
     logout_user()
     return redirect(url_for('login'))
 
-@app.errorhandler(429)
+@limiter.exempt
+def upstream_health():
+    """Expose circuit breaker state for monitoring"""
+    return jsonify(circuit_breaker.all_stats())
+
 def ratelimit_handler(e):
     flash('Too many requests, please try again later')
     return redirect(url_for('login'))
 
-@app.errorhandler(500)
 def internal_error(e):
     flash('Internal server error, please try again later')
     return redirect(url_for('login'))
 
-@app.errorhandler(404)
 def not_found_error(e):
     flash('Page not found')
     return redirect(url_for('login'))
 
-if __name__ == '__main__':
-    # Set application configuration
-    app.config['RATELIMIT_HEADERS_ENABLED'] = True
-    app.config['RATELIMIT_STORAGE_URL'] = 'memory://'
+def create_app():
+    """Create and configure the Flask application.
+
+    Nothing here touches the network or scans processes, and SDK clients
+    and stores are built on first use, so workers boot and respawn quickly.
+    """
+    app = Flask(__name__)
+    app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key')
+
+    # Allow rate limiting to be switched off, e.g. for load benchmarks
+    app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() != 'false'
+
+    # Count limits in the shared state backend so they hold across workers, not per process
+    app.config['RATELIMIT_STORAGE_URI'] = shared_state.SHARED_STATE_URL
     app.config['RATELIMIT_STRATEGY'] = 'fixed-window'
-    
+    app.config['RATELIMIT_HEADERS_ENABLED'] = True
+
+    # Installed first so request IDs and timings cover the rate limit check
+    logging_setup.init_app(app)
+    metrics.init_app(app)
+    login_manager.init_app(app)
+    limiter.init_app(app)
+
+    # Register blueprints
+    app.register_blueprint(engagement_bp, url_prefix='/engagement')
+    app.register_blueprint(support_bp, url_prefix='/support')
+    app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
+
+    app.add_url_rule('/', 'home', home)
+    app.add_url_rule('/login', 'login', login, methods=['GET', 'POST'])
+    app.add_url_rule('/index', 'index', index)
+    app.add_url_rule('/logout', 'logout', logout)
+    app.add_url_rule('/health/upstreams', 'upstream_health', upstream_health)
+    app.add_url_rule('/metrics', 'metrics', limiter.exempt(metrics.metrics_view))
+
+    app.register_error_handler(429, ratelimit_handler)
+    app.register_error_handler(500, internal_error)
+    app.register_error_handler(404, not_found_error)
+    return app
+
+if __name__ == '__main__':
     # Start application
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
 
 '''
 Default login credentials:
@@ -0,0 +1,168 @@
+"""
+Batch profile analysis for advisors: runs /engagement/profile-style analysis
+over a JSON Lines file of client profiles without going through the web app.
+
+Each input line is a profile object with the profile questionnaire fields
+and an optional "id". Identical profiles are analyzed once, calls run with
+bounded concurrency, and every finished profile is appended to the output
+file straight away. The output doubles as the checkpoint: rerunning with the
+same output skips profiles that already succeeded and retries failed ones.
+Ctrl-C stops sending profiles straight away, so an interrupted run costs
+at most the few calls already in flight.
+
+Usage: python batch_advice.py profiles.jsonl results.jsonl [--concurrency 4]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables before engagement reads its configuration
+load_dotenv()
+
+from circuit_breaker import CircuitOpenError
+from logging_setup import configure_logging
+from engagement import PROFILE_FIELDS, build_profile_prompt, get_gemini_response, prompt_cache_key
+
+DEFAULT_CONCURRENCY = 4  # Parallel Gemini calls
+CIRCUIT_WAIT_BUDGET = 300  # Seconds a profile may wait for an open circuit to close
+QUEUED_PER_WORKER = 2  # Jobs submitted ahead per parallel call; more are submitted as these finish
+
+
+def read_profiles(path):
+    """Group input profiles by prompt so identical ones are analyzed once"""
+    jobs = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                profile = json.loads(line)
+            except ValueError as e:
+                print(f"Skipping line {line_number}: invalid JSON ({str(e)})")
+                continue
+            if not isinstance(profile, dict):
+                print(f"Skipping line {line_number}: expected a JSON object")
+                continue
+            profile_id = profile.get('id', line_number)
+            missing_fields = [field for field in PROFILE_FIELDS if not profile.get(field)]
+            if missing_fields:
+                print(f"Skipping profile {profile_id}: missing {', '.join(missing_fields)}")
+                continue
+            prompt, metrics = build_profile_prompt(profile)
+            key = prompt_cache_key(prompt)
+            job = jobs.setdefault(key, {'key': key, 'prompt': prompt, 'metrics': metrics, 'ids': []})
+            job['ids'].append(profile_id)
+    return jobs
+
+
+def completed_keys(path):
+    """Keys of profiles that already have a successful result in the output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by an interrupted run
+            if record.get('success'):
+                done.add(record['key'])
+    return done
+
+
+def analyze(job):
+    """Run one analysis, waiting out an open circuit instead of failing fast"""
+    deadline = time.monotonic() + CIRCUIT_WAIT_BUDGET
+    while True:
+        try:
+            return get_gemini_response(job['prompt'])
+        except CircuitOpenError as e:
+            wait = e.retry_after or 1
+            if time.monotonic() + wait > deadline:
+                raise
+            time.sleep(wait)
+
+
+def result_record(job, future):
+    record = {
+        'key': job['key'],
+        'ids': job['ids'],
+        'metrics': job['metrics'],
+        'timestamp': datetime.now().isoformat()
+    }
+    try:
+        record['analysis'] = future.result()
+        record['success'] = True
+    except Exception as e:
+        record['error'] = str(e)
+        record['success'] = False
+    return record
+
+
+def run(input_path, output_path, concurrency=DEFAULT_CONCURRENCY):
+    jobs = read_profiles(input_path)
+    done = completed_keys(output_path)
+    pending = [job for key, job in jobs.items() if key not in done]
+    print(f"{len(jobs)} unique profiles, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+
+    succeeded = failed = 0
+    remaining = iter(pending)
+    in_flight = {}
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def submit_more():
+        # Only a few jobs are queued at a time, so an interrupted run leaves the rest unsent
+        while len(in_flight) < concurrency * QUEUED_PER_WORKER:
+            job = next(remaining, None)
+            if job is None:
+                return
+            in_flight[executor.submit(analyze, job)] = job
+
+    try:
+        with open(output_path, 'a', encoding='utf-8') as output:
+            submit_more()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = result_record(in_flight.pop(future), future)
+                    if record['success']:
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    # Results are written from this thread only, one complete line at a time
+                    output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    output.flush()
+                    if (succeeded + failed) % 100 == 0:
+                        print(f"Progress: {succeeded + failed}/{len(pending)}")
+                submit_more()
+    except KeyboardInterrupt:
+        # Drop queued jobs so no more Gemini calls are made; calls already running end unrecorded
+        executor.shutdown(wait=False, cancel_futures=True)
+        print(f"Interrupted after {succeeded + failed}/{len(pending)}; rerun with the same output to resume")
+        raise
+    executor.shutdown()
+
+    print(f"Finished: {succeeded} succeeded, {failed} failed")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch profile analysis from a JSON Lines file')
+    parser.add_argument('input', help='JSON Lines file with one client profile per line')
+    parser.add_argument('output', help='JSON Lines file results are appended to; also the resume checkpoint')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Gemini calls to run in parallel')
+    args = parser.parse_args()
+    # Upstream warnings go to stderr, leaving stdout to the progress report
+    configure_logging(stream=sys.stderr)
+    sys.exit(0 if run(args.input, args.output, max(1, args.concurrency)) else 1)
+
+
+if __name__ == '__main__':
+    main()
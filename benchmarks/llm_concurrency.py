@@ -0,0 +1,48 @@
+"""
+Load benchmark for LLM-bound endpoints across server setups.
+
+Starts the upstream stub with a fixed Gemini latency, runs the app behind
+it in each execution mode and drives /engagement/chat with many concurrent
+clients. Reports throughput and latency percentiles per mode. For the other
+endpoints and a single mode, see load_test.py.
+
+Modes: dev (Flask development server, as app.py runs it), sync (gunicorn
+sync workers), gevent (serve_gevent.py) and gunicorn (the production
+profile, gunicorn.conf.py with wsgi:app).
+
+Usage: python benchmarks/llm_concurrency.py [--clients 200] [--requests 600] [--latency 1.0] [--modes dev,gunicorn]
+"""
+import argparse
+
+from load_test import free_port, login, run_scenario, start_app, stop_app
+from upstream_stub import StubConfig, app_env, start_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=200, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=600, help='total requests per mode')
+    parser.add_argument('--latency', type=float, default=1.0, help='fake Gemini latency in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='sync gunicorn workers')
+    parser.add_argument('--modes', default='dev,sync,gevent,gunicorn', help='comma-separated execution modes')
+    args = parser.parse_args()
+
+    stub = start_stub(StubConfig(gemini_latency=args.latency, jitter=0))
+    env = app_env(stub.base_url)
+
+    print(f"{args.clients} clients, {args.requests} requests, {args.latency}s upstream latency")
+    print(f"{'mode':<10}{'req/s':>10}{'p50 (s)':>10}{'p99 (s)':>10}{'errors':>8}")
+    for mode in args.modes.split(','):
+        port = free_port()
+        process = start_app(mode, port, env, args.workers)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            result = run_scenario(base_url, login(base_url), 'engagement_chat', args.clients,
+                                  total=args.requests, variants=args.requests)
+        finally:
+            stop_app(process)
+        print(f"{mode:<10}{result['throughput']:>10.1f}{result['p50']:>10.2f}{result['p99']:>10.2f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
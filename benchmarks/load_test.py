@@ -0,0 +1,269 @@
+"""
+End-to-end load test against the local upstream stub.
+
+Starts the upstream stub, runs the app against it in the chosen execution
+mode and drives each scenario with concurrent clients for a fixed time,
+reporting throughput, p50/p90/p99 latency, failures and the upstream calls
+each scenario caused. Nothing leaves the machine, so runs are repeatable
+and can be compared: --save writes the results as JSON and --compare
+prints the change against a saved run.
+
+The clients run on the same machine as the app; on a small machine they
+compete with it for CPU, so compare runs made on the same machine.
+
+Usage: python benchmarks/load_test.py [--mode gunicorn] [--clients 50] [--duration 20]
+                                      [--scenarios dashboard,engagement_chat] [--variants 50]
+                                      [--save results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from upstream_stub import add_stub_arguments, app_env, config_from_args, start_stub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('dev', 'sync', 'gevent', 'gunicorn')
+LOGIN = {'email': 'admin@example.com', 'password': 'admin123'}
+
+PROFILE = {
+    'age': 35,
+    'occupation': 'Engineer',
+    'monthly_income': 8000,
+    'monthly_expenses': 5000,
+    'assets': '50000 savings',
+    'risk_preference': 'moderate'
+}
+
+
+def profile(i):
+    return dict(PROFILE, age=25 + i)
+
+
+# name -> (method, path, payload for the i-th prompt variant)
+SCENARIOS = {
+    'dashboard': ('GET', '/dashboard/update_data', None),
+    'engagement_chat': ('POST', '/engagement/chat', lambda i: {'message': f"How should I invest bonus {i}?"}),
+    'engagement_profile': ('POST', '/engagement/profile', profile),
+    'engagement_advice': ('POST', '/engagement/financial_advice', lambda i: {
+        'income': 6000 + i * 100, 'expenses': 4000, 'assets': 20000, 'risk_profile': 'moderate'
+    }),
+    'engagement_plan': ('POST', '/engagement/custom_plan', lambda i: {
+        'goal_type': 'retirement', 'target_amount': 500000 + i * 1000, 'time_horizon': '20 years',
+        'current_finance': {'income': 8000, 'expenses': 5000, 'assets': 50000, 'risk_profile': 'moderate'}
+    }),
+    'engagement_simulation': ('POST', '/engagement/simulation', lambda i: {
+        'initial_amount': 10000 + i * 100, 'annual_rate': 6, 'years': 20, 'monthly_contribution': 500
+    }),
+    'support_chat': ('POST', '/support/chat', lambda i: {'message': f"How do I reset my password ({i})?"}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(mode, port, env=None, workers=4):
+    """Run the app in an execution mode and wait until it answers.
+
+    The app runs in a fresh working directory, so its history, watchlist and
+    shared state files start empty and the repository's are left alone.
+    """
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        GEMINI_API_KEY='benchmark',
+        GEMINI_POOL_MAXSIZE='1000',
+        RATELIMIT_ENABLED='false',
+        PORT=str(port),
+        METRICS_DIR=os.path.join(workdir, 'metrics'),
+        **(env or {})
+    )
+    if mode == 'dev':
+        command = [sys.executable, '-c', f'from app import create_app; create_app().run(port={port})']
+    elif mode == 'sync':
+        command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-k', 'sync',
+                   '-b', f'127.0.0.1:{port}', '--timeout', '120', 'app:create_app()']
+    elif mode == 'gunicorn':
+        env.update(HOST='127.0.0.1', GUNICORN_ACCESS_LOG='')
+        command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'wsgi:app']
+    elif mode == 'gevent':
+        command = [sys.executable, os.path.join(ROOT, 'serve_gevent.py')]
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    process.workdir = workdir
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/login', timeout=1)
+            return process
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    stop_app(process)
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def stop_app(process):
+    process.terminate()
+    process.wait()
+    shutil.rmtree(process.workdir, ignore_errors=True)
+
+
+def login(base_url):
+    """Log in once and analyze a profile, which the simulation scenario needs; returns the cookies"""
+    session = requests.Session()
+    session.post(f'{base_url}/login', data=LOGIN)
+    session.post(f'{base_url}/engagement/profile', json=PROFILE, timeout=120)
+    return session.cookies.get_dict()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))]
+
+
+def succeeded(response):
+    if response.status_code != 200:
+        return False
+    try:
+        return response.json().get('success', True) is not False
+    except ValueError:
+        return True
+
+
+def run_scenario(base_url, cookies, scenario, clients, duration=None, total=None, variants=50):
+    """Drive one scenario with closed-loop clients for `duration` seconds or `total` requests"""
+    method, path, payload = SCENARIOS[scenario]
+    latencies = []
+    failures = []
+    counter = iter(range(sys.maxsize))
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+
+    def client():
+        session = requests.Session()
+        session.cookies.update(cookies)
+        while True:
+            with lock:
+                i = next(counter)
+            if (total is not None and i >= total) or (deadline is not None and time.monotonic() >= deadline):
+                return
+            body = payload(i % variants) if payload else None
+            started = time.perf_counter()
+            try:
+                ok = succeeded(session.request(method, f'{base_url}{path}', json=body, timeout=300))
+            except requests.exceptions.RequestException:
+                ok = False
+            latency = time.perf_counter() - started
+            with lock:
+                latencies.append(latency)
+                if not ok:
+                    failures.append(latency)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(failures),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p90': percentile(latencies, 90),
+        'p99': percentile(latencies, 99)
+    }
+
+
+def upstream_calls(before, after):
+    """Stub calls made between two stats snapshots, e.g. {'generateContent:ok': 12}"""
+    return {key: after[key] - before.get(key, 0) for key in sorted(after) if after[key] - before.get(key, 0)}
+
+
+def print_results(results, baseline=None):
+    print(f"{'scenario':<24}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'errors':>8}  upstream calls")
+    for scenario, result in results.items():
+        calls = ', '.join(f"{key}={count}" for key, count in result['upstream'].items()) or '-'
+        print(f"{scenario:<24}{result['throughput']:>9.1f}{result['p50'] * 1000:>9.0f}"
+              f"{result['p90'] * 1000:>9.0f}{result['p99'] * 1000:>9.0f}{result['errors']:>8}  {calls}")
+        previous = (baseline or {}).get(scenario)
+        if previous:
+            changes = []
+            for key in ('throughput', 'p50', 'p99'):
+                if previous[key]:
+                    changes.append(f"{key} {(result[key] - previous[key]) / previous[key] * 100:+.1f}%")
+            print(f"{'':<24}vs baseline: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=MODES, default='gunicorn', help='how the app is served')
+    parser.add_argument('--workers', type=int, default=4, help='workers for the sync mode')
+    parser.add_argument('--clients', type=int, default=50, help='concurrent clients per scenario')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated scenarios')
+    parser.add_argument('--variants', type=int, default=50,
+                        help='distinct payloads per scenario; fewer means more response cache hits')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier --save to compare against')
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    stub = start_stub(config_from_args(args))
+    env = dict(app_env(stub.base_url), ALPHA_VANTAGE_API_KEY='benchmark', ALPHA_VANTAGE_CALLS_PER_MINUTE='600')
+    port = free_port()
+    process = start_app(args.mode, port, env, args.workers)
+    base_url = f'http://127.0.0.1:{port}'
+    print(f"{args.mode} mode, {args.clients} clients, {args.duration:g}s per scenario, "
+          f"Gemini {args.gemini_latency:g}s / Alpha Vantage {args.alpha_vantage_latency:g}s upstream latency, "
+          f"{args.error_rate:.0%} errors, {args.note_rate:.0%} rate-limit notes")
+
+    results = {}
+    try:
+        cookies = login(base_url)
+        for scenario in scenarios:
+            before = stub.snapshot()
+            result = run_scenario(base_url, cookies, scenario, args.clients,
+                                  duration=args.duration, variants=args.variants)
+            result['upstream'] = upstream_calls(before, stub.snapshot())
+            results[scenario] = result
+    finally:
+        stop_app(process)
+        stub.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Startup benchmark: how long a fresh worker process takes to become ready.
+
+Runs a new interpreter several times, each importing the app, building it
+and serving one request, and reports the median time of each phase as well
+as the whole process. This is what a gunicorn worker pays on boot and on
+every respawn.
+
+Usage: python benchmarks/startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r'''
+import json, time
+start = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+application = module.create_app() if hasattr(module, 'create_app') else module.app
+created = time.perf_counter()
+application.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'create_app': created - imported,
+    'first_request': served - created
+}))
+'''
+
+
+def run_once():
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY', 'benchmark'))
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', WORKER], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process'] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worker startup time')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    print(f"Median of {args.runs} runs:")
+    for phase in ('import', 'create_app', 'first_request', 'process'):
+        print(f"  {phase:<14} {statistics.median(run[phase] for run in runs) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
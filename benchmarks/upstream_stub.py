@@ -0,0 +1,279 @@
+"""
+Local stand-in for the Gemini and Alpha Vantage APIs.
+
+Serves generateContent and streamGenerateContent (REST, as the app and the
+Gemini SDK call them) and the GLOBAL_QUOTE, REALTIME_BULK_QUOTES and
+NEWS_SENTIMENT functions of Alpha Vantage's /query endpoint, with
+configurable latency, error rate and rate-limit "Note" responses. Counts of
+calls per API and outcome are served at /__stats.
+
+Point the app at it with the variables from app_env(); running this file
+prints them.
+
+Usage: python benchmarks/upstream_stub.py [--port 8700] [--gemini-latency 1.0] [--alpha-vantage-latency 0.2]
+                                          [--error-rate 0] [--note-rate 0]
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+GEMINI_PATH = '/v1beta/models/gemini-pro'
+ALPHA_VANTAGE_PATH = '/query'
+
+RATE_LIMIT_NOTE = ("Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per "
+                   "minute and 500 calls per day.")
+STREAM_CHUNKS = 5  # Pieces a streamed reply is split into, spread over the latency
+
+
+class StubConfig:
+    """Behaviour of the stub; attributes may be changed while it is serving"""
+
+    def __init__(self, gemini_latency=1.0, alpha_vantage_latency=0.2, jitter=0.2, error_rate=0.0,
+                 note_rate=0.0, reply_size=1500, seed=None):
+        self.gemini_latency = gemini_latency  # Seconds per generateContent call
+        self.alpha_vantage_latency = alpha_vantage_latency  # Seconds per /query call
+        self.jitter = jitter  # Latency varies uniformly by this fraction either way
+        self.error_rate = error_rate  # Share of calls answered with a 503
+        self.note_rate = note_rate  # Share of Alpha Vantage calls answered with a rate-limit Note
+        self.reply_size = reply_size  # Characters in a Gemini reply
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self, latency):
+        with self.lock:
+            return max(0.0, latency * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+
+def gemini_reply(prompt, size):
+    """Deterministic reply text for a prompt, padded to size characters"""
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+    text = f"Stub analysis {digest} for a {len(prompt)}-character prompt. "
+    filler = "Diversify, keep an emergency fund and review the plan yearly. "
+    return (text + filler * (size // len(filler) + 1))[:max(size, len(text))]
+
+
+def candidate(text):
+    """generateContent response body carrying text"""
+    return {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'},
+                            'finishReason': 'STOP', 'index': 0}]}
+
+
+def prompt_text(body):
+    """Concatenated text parts of the last turn of a generateContent request"""
+    contents = body.get('contents') or [{}]
+    return ''.join(part.get('text', '') for part in contents[-1].get('parts', []))
+
+
+def quote_price(symbol):
+    """A stable base price per symbol with a small random walk"""
+    base = int(hashlib.sha256(symbol.encode('utf-8')).hexdigest()[:6], 16) % 900 + 50
+    return f"{base * (1 + random.uniform(-0.01, 0.01)):.4f}"
+
+
+def news_feed(count=10):
+    now = time.strftime('%Y%m%dT%H%M%S')
+    return [{
+        'title': f"Stub market story {i + 1}",
+        'summary': f"Simulated news summary number {i + 1} for offline load tests.",
+        'url': f"https://example.com/news/{i + 1}",
+        'source': 'Stub Wire',
+        'time_published': now
+    } for i in range(count)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, as the app's pooled sessions expect
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def count(self, api, outcome):
+        with self.server.stats_lock:
+            self.server.stats[f'{api}:{outcome}'] += 1
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/__stats':
+            with self.server.stats_lock:
+                self.send_json(200, dict(self.server.stats))
+        elif url.path == ALPHA_VANTAGE_PATH:
+            self.alpha_vantage(parse_qs(url.query))
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            body = {}
+        if url.path.endswith(':generateContent'):
+            self.generate_content(body)
+        elif url.path.endswith(':streamGenerateContent'):
+            self.stream_generate_content(body, 'sse' in parse_qs(url.query).get('alt', []))
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def gemini_error(self, api):
+        self.count(api, 'error')
+        self.send_json(503, {'error': {'code': 503, 'message': 'Stub overloaded', 'status': 'UNAVAILABLE'}})
+
+    def generate_content(self, body):
+        config = self.server.config
+        time.sleep(config.delay(config.gemini_latency))
+        if config.roll(config.error_rate):
+            return self.gemini_error('generateContent')
+        self.count('generateContent', 'ok')
+        self.send_json(200, candidate(gemini_reply(prompt_text(body), config.reply_size)))
+
+    def stream_generate_content(self, body, sse):
+        config = self.server.config
+        gap = config.delay(config.gemini_latency) / STREAM_CHUNKS
+        time.sleep(gap)
+        if config.roll(config.error_rate):
+            return self.gemini_error('streamGenerateContent')
+        self.count('streamGenerateContent', 'ok')
+
+        reply = gemini_reply(prompt_text(body), config.reply_size)
+        size = -(-len(reply) // STREAM_CHUNKS)
+        chunks = [reply[i:i + size] for i in range(0, len(reply), size)]
+        # Streams end with the connection, so no Content-Length is needed
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream' if sse else 'application/json; charset=UTF-8')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        if not sse:
+            self.wfile.write(b'[')
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(gap)
+            data = json.dumps(candidate(chunk))
+            self.wfile.write((f"data: {data}\r\n\r\n" if sse else (',' if i else '') + data).encode('utf-8'))
+            self.wfile.flush()
+        if not sse:
+            self.wfile.write(b']')
+
+    def alpha_vantage(self, query):
+        config = self.server.config
+        function = query.get('function', [''])[0]
+        time.sleep(config.delay(config.alpha_vantage_latency))
+        if config.roll(config.error_rate):
+            self.count(function, 'error')
+            return self.send_json(503, {'Error Message': 'Stub overloaded'})
+        if config.roll(config.note_rate):
+            self.count(function, 'note')
+            return self.send_json(200, {'Note': RATE_LIMIT_NOTE})
+
+        symbols = query.get('symbol', [''])[0]
+        if function == 'GLOBAL_QUOTE':
+            data = {'Global Quote': {'01. symbol': symbols, '05. price': quote_price(symbols)}}
+        elif function == 'REALTIME_BULK_QUOTES':
+            data = {'data': [{'symbol': symbol, 'close': quote_price(symbol)} for symbol in symbols.split(',') if symbol]}
+        elif function == 'NEWS_SENTIMENT':
+            data = {'feed': news_feed()}
+        else:
+            self.count(function, 'invalid')
+            return self.send_json(200, {'Error Message': f"Invalid API call: {function}"})
+        self.count(function, 'ok')
+        self.send_json(200, data)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, config):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def snapshot(self):
+        with self.stats_lock:
+            return Counter(self.stats)
+
+
+def start_stub(config=None, host='127.0.0.1', port=0):
+    """Serve the stub on a background thread; port 0 picks a free one"""
+    server = StubServer((host, port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, name='upstream-stub', daemon=True).start()
+    return server
+
+
+def app_env(base_url):
+    """Environment variables that point the app at a stub at base_url"""
+    return {
+        'GEMINI_API_URL': f'{base_url}{GEMINI_PATH}:generateContent',
+        'GEMINI_STREAM_URL': f'{base_url}{GEMINI_PATH}:streamGenerateContent',
+        'GEMINI_API_ENDPOINT': base_url,
+        'GEMINI_TRANSPORT': 'rest',
+        'ALPHA_VANTAGE_URL': f'{base_url}{ALPHA_VANTAGE_PATH}',
+    }
+
+
+def add_stub_arguments(parser):
+    parser.add_argument('--gemini-latency', type=float, default=1.0, help='seconds per Gemini call')
+    parser.add_argument('--alpha-vantage-latency', type=float, default=0.2, help='seconds per Alpha Vantage call')
+    parser.add_argument('--jitter', type=float, default=0.2, help='latency varies by this fraction either way')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of calls failing with a 503')
+    parser.add_argument('--note-rate', type=float, default=0.0, help='share of Alpha Vantage calls rate-limited')
+    parser.add_argument('--reply-size', type=int, default=1500, help='characters per Gemini reply')
+    parser.add_argument('--seed', type=int, default=None, help='seed for latency and failure draws')
+
+
+def config_from_args(args):
+    return StubConfig(
+        gemini_latency=args.gemini_latency,
+        alpha_vantage_latency=args.alpha_vantage_latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        note_rate=args.note_rate,
+        reply_size=args.reply_size,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8700)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), config_from_args(args))
+    print(f"Upstream stub on {server.base_url}; start the app with:")
+    for name, value in app_env(server.base_url).items():
+        print(f"  export {name}={value}")
+    print("  export GEMINI_API_KEY=stub ALPHA_VANTAGE_API_KEY=stub")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+import threading
+import time
+
+# Cache lookup states
+FRESH = 'fresh'
+STALE = 'stale'
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTLs and a stale-while-revalidate window"""
+
+    def __init__(self, maxsize=128, ttl=60, stale_ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl  # How long an expired entry may still be served
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return (value, state); state is FRESH, STALE or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+
+            value, expires_at, stale_until = entry
+            if now < expires_at:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value, FRESH
+            if now < stale_until:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                return value, STALE
+
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None, None
+
+    def peek(self, key):
+        """Return the stored value regardless of age, without touching counters or LRU order"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[0] if entry else None
+
+    def peek_many(self, keys):
+        """Return {key: value} for the stored keys, like peek"""
+        with self._lock:
+            return {key: self._data[key][0] for key in keys if key in self._data}
+
+    def fresh_keys(self, keys):
+        """Return the subset of keys with a fresh entry, without touching counters"""
+        now = time.monotonic()
+        with self._lock:
+            return {key for key in keys if key in self._data and now < self._data[key][1]}
+
+    def set(self, key, value, ttl=None, stale_ttl=None):
+        """Store a value with an optional per-entry TTL"""
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        stale_until = expires_at + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at, stale_until)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': (self.hits + self.stale_hits) / lookups if lookups else 0.0
+            }
+
+
+class SharedTTLCache:
+    """TTLCache counterpart on a shared_state store, so every worker sees the same entries.
+
+    Entries keep their fresh and stale windows; expired values stay
+    available to peek for `retain` seconds after they stop being servable.
+    """
+
+    def __init__(self, store, prefix, ttl=60, stale_ttl=0, retain=0):
+        self.store = store
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.retain = retain
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        """Return (value, state); state is FRESH, STALE or None on a miss"""
+        entry = self.store.get(self.prefix + key)
+        if entry is None:
+            self._count('misses')
+            return None, None
+
+        value, expires_at, stale_until = entry
+        now = time.time()
+        if now < expires_at:
+            self._count('hits')
+            return value, FRESH
+        if now < stale_until:
+            self._count('stale_hits')
+            return value, STALE
+
+        self._count('expirations')
+        self._count('misses')
+        return None, None
+
+    def peek(self, key):
+        entry = self.store.get(self.prefix + key)
+        return entry[0] if entry else None
+
+    def peek_many(self, keys):
+        keys = list(keys)
+        entries = self.store.get_many(self.prefix + key for key in keys)
+        return {key: entries[self.prefix + key][0] for key in keys if self.prefix + key in entries}
+
+    def fresh_keys(self, keys):
+        keys = list(keys)
+        entries = self.store.get_many(self.prefix + key for key in keys)
+        now = time.time()
+        return {key for key in keys if self.prefix + key in entries and now < entries[self.prefix + key][1]}
+
+    def set(self, key, value, ttl=None, stale_ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.time()
+        self.store.set(
+            self.prefix + key,
+            [value, now + ttl, now + ttl + stale_ttl],
+            ttl=ttl + stale_ttl + self.retain
+        )
+
+    def delete(self, key):
+        self.store.delete(self.prefix + key)
+
+    def clear(self):
+        self.store.clear(self.prefix)
+
+    def stats(self):
+        """Return this process's lookup counters"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'hit_ratio': (self.hits + self.stale_hits) / lookups if lookups else 0.0
+            }
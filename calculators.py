@@ -0,0 +1,114 @@
+import re
+
+AMOUNT_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k|m|thousand|million)?\b', re.IGNORECASE)
+MULTIPLIERS = {'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'million': 1e6}
+LIQUID_KEYWORDS = ('saving', 'cash', 'deposit', 'checking', 'emergency')
+
+DEFAULT_SAVINGS_RETURN = 0.04  # Annual return assumed when projecting savings toward a goal
+
+
+def parse_amount(value):
+    """Read a money amount from a number or free text such as '$5,000' or '5k', or None"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = AMOUNT_PATTERN.search(str(value or ''))
+    if not match:
+        return None
+    amount = float(match.group(1).replace(',', ''))
+    return amount * MULTIPLIERS.get((match.group(2) or '').lower(), 1)
+
+
+def parse_liquid_assets(value):
+    """Amount of cash-like assets in an asset description, falling back to the first amount"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    clauses = re.split(r'[;,]\s+|\band\b', str(value or ''), flags=re.IGNORECASE)
+    liquid = [parse_amount(clause) for clause in clauses
+              if any(keyword in clause.lower() for keyword in LIQUID_KEYWORDS)]
+    liquid = [amount for amount in liquid if amount is not None]
+    return sum(liquid) if liquid else parse_amount(value)
+
+
+def parse_years(value):
+    """Read a time horizon in years from a number or text such as '5 years' or '18 months'"""
+    amount = parse_amount(value)
+    if amount is None:
+        return None
+    return amount / 12 if 'month' in str(value).lower() else amount
+
+
+def savings_rate(income, expenses):
+    if not income:
+        return None
+    return (income - expenses) / income
+
+
+def emergency_fund_months(liquid_assets, expenses):
+    if not expenses:
+        return None
+    return liquid_assets / expenses
+
+
+def required_monthly_saving(target, years, current=0, annual_rate=DEFAULT_SAVINGS_RETURN):
+    """Monthly deposit that grows current savings to target within years"""
+    months = round(years * 12)
+    if months <= 0:
+        return None
+    monthly_rate = (1 + annual_rate) ** (1 / 12) - 1
+    growth = (1 + monthly_rate) ** months
+    remaining = target - current * growth
+    if remaining <= 0:
+        return 0.0
+    if monthly_rate == 0:
+        return remaining / months
+    return remaining * monthly_rate / (growth - 1)
+
+
+def financial_metrics(income=None, expenses=None, assets=None, target_amount=None, time_horizon=None,
+                      annual_rate=DEFAULT_SAVINGS_RETURN):
+    """Compute the quantitative facts for a plan from free-text inputs; unknowns stay None"""
+    income = parse_amount(income)
+    expenses = parse_amount(expenses)
+    liquid_assets = parse_liquid_assets(assets)
+    target = parse_amount(target_amount)
+    years = parse_years(time_horizon)
+
+    metrics = {
+        'monthly_income': income,
+        'monthly_expenses': expenses,
+        'monthly_surplus': income - expenses if income is not None and expenses is not None else None,
+        'savings_rate': savings_rate(income, expenses) if expenses is not None else None,
+        'liquid_assets': liquid_assets,
+        'emergency_fund_months': emergency_fund_months(liquid_assets, expenses) if liquid_assets is not None else None,
+        'target_amount': target,
+        'time_horizon_years': years,
+        'assumed_annual_return': annual_rate,
+        'required_monthly_saving': None,
+        'goal_feasible': None
+    }
+    if target is not None and years:
+        required = required_monthly_saving(target, years, liquid_assets or 0, annual_rate)
+        metrics['required_monthly_saving'] = required
+        if required is not None and metrics['monthly_surplus'] is not None:
+            metrics['goal_feasible'] = metrics['monthly_surplus'] >= required
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in metrics.items()}
+
+
+def format_metrics(metrics):
+    """Render computed metrics as prompt lines, skipping the ones that couldn't be computed"""
+    lines = []
+    if metrics.get('monthly_surplus') is not None:
+        lines.append(f"Monthly Surplus: ${metrics['monthly_surplus']:,.2f}")
+    if metrics.get('savings_rate') is not None:
+        lines.append(f"Savings Rate: {metrics['savings_rate']:.1%}")
+    if metrics.get('emergency_fund_months') is not None:
+        lines.append(f"Emergency Fund: {metrics['emergency_fund_months']:.1f} months of expenses")
+    if metrics.get('required_monthly_saving') is not None:
+        lines.append(
+            f"Required Monthly Saving: ${metrics['required_monthly_saving']:,.2f} to reach "
+            f"${metrics['target_amount']:,.2f} in {metrics['time_horizon_years']:g} years "
+            f"at {metrics['assumed_annual_return']:.0%} annual return"
+        )
+    if metrics.get('goal_feasible') is not None:
+        lines.append(f"Goal Reachable From Current Surplus: {'Yes' if metrics['goal_feasible'] else 'No'}")
+    return '\n'.join(lines)
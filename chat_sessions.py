@@ -0,0 +1,185 @@
+from collections import OrderedDict
+from flask import session as flask_session
+from flask_login import current_user
+import re
+import threading
+import time
+import uuid
+
+# Rough token estimate: Gemini averages about four characters per token in English
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def first_sentence(text, max_chars=200):
+    """Cheap extractive summary of a turn: its first sentence, truncated"""
+    text = ' '.join(text.split())
+    match = re.match(r'(.+?[.!?])(\s|$)', text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3] + '...'
+
+
+def summarize_turn(summary, user_text, model_text, max_tokens=300):
+    """Fold an old turn into the running summary, keeping the summary bounded"""
+    line = f"User asked: {first_sentence(user_text)} Assistant replied: {first_sentence(model_text)}"
+    lines = (summary.split('\n') if summary else []) + [line]
+    # Drop the oldest summarized turns once the summary itself gets too long
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+class ConversationSession:
+    """Recent turns of one conversation plus a summary of older ones"""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.turns = []  # (user_text, model_text) pairs, oldest first
+        self.summary = ''
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def tokens(self):
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(user_text) + estimate_tokens(model_text) for user_text, model_text in self.turns
+        )
+
+    def state(self):
+        """The window as JSON-serializable data for a shared_state store"""
+        return {'summary': self.summary, 'turns': [list(turn) for turn in self.turns]}
+
+    def load(self, state):
+        """Replace the window with one read from a shared_state store; None means it expired"""
+        state = state or {}
+        self.summary = state.get('summary', '')
+        self.turns = [tuple(turn) for turn in state.get('turns', [])]
+
+    def contents(self, preamble=None):
+        """Return the window as Gemini chat contents, opening with the preamble and summary"""
+        with self.lock:
+            summary, turns = self.summary, list(self.turns)
+        opening = '\n\n'.join(part for part in (
+            preamble,
+            f"Summary of the earlier conversation:\n{summary}" if summary else None
+        ) if part)
+        contents = []
+        if opening:
+            contents.append({'role': 'user', 'parts': [opening]})
+            contents.append({'role': 'model', 'parts': ['Understood.']})
+        for user_text, model_text in turns:
+            contents.append({'role': 'user', 'parts': [user_text]})
+            contents.append({'role': 'model', 'parts': [model_text]})
+        return contents
+
+    def prompt(self, message):
+        """Return the window and a new message as a single text prompt"""
+        with self.lock:
+            summary, turns = self.summary, list(self.turns)
+        lines = []
+        if summary:
+            lines.append(f"Summary of the earlier conversation:\n{summary}\n")
+        for user_text, model_text in turns:
+            lines.append(f"User: {user_text}")
+            lines.append(f"Assistant: {model_text}")
+        lines.append(f"User: {message}")
+        return '\n'.join(lines)
+
+
+class ChatSessionManager:
+    """Keep conversation sessions per user with a bounded token window.
+
+    Older turns are folded into a short summary once a session's window
+    exceeds max_tokens, so prompt size stays flat as a conversation grows.
+    Sessions idle for longer than idle_ttl are dropped, and the least
+    recently used session is evicted beyond max_sessions.
+
+    `store` returns a shared_state store. When that store is shared, each
+    window is kept there under its key with idle_ttl as its TTL, so every
+    worker continues the same conversation; the sessions held here are then
+    only a cache, refreshed from the store on each get.
+    """
+
+    def __init__(self, max_sessions=1000, idle_ttl=1800, max_tokens=2000, keep_turns=2,
+                 summarize=summarize_turn, store=None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns  # Recent turns always kept verbatim
+        self.summarize = summarize
+        self.store = store
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the session for key, creating it if needed"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = ConversationSession(key)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            self._sessions.move_to_end(key)
+            session.last_used = now
+
+        store = self._shared_store()
+        if store is not None:
+            # The previous turn may have been recorded by another worker
+            state = store.get(self._store_key(key))
+            with session.lock:
+                session.load(state)
+        return session
+
+    def record(self, session, user_text, model_text):
+        """Add a completed turn and compact the window to the token budget"""
+        store = self._shared_store()
+        with session.lock:
+            if store is not None:
+                session.load(store.get(self._store_key(session.key)))
+            session.turns.append((user_text, model_text))
+            while len(session.turns) > self.keep_turns and session.tokens() > self.max_tokens:
+                old_user_text, old_model_text = session.turns.pop(0)
+                session.summary = self.summarize(session.summary, old_user_text, old_model_text)
+            if store is not None:
+                store.set(self._store_key(session.key), session.state(), ttl=self.idle_ttl)
+
+    def reset(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+        store = self._shared_store()
+        if store is not None:
+            store.delete(self._store_key(key))
+
+    def _shared_store(self):
+        store = self.store() if self.store is not None else None
+        return store if store is not None and store.shared else None
+
+    @staticmethod
+    def _store_key(key):
+        return f'chat:{key}'
+
+    def _evict_idle(self, now):
+        # Sessions are kept in LRU order, so idle ones are at the front
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.idle_ttl:
+                break
+            del self._sessions[key]
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def conversation_key(namespace):
+    """Key a conversation to the logged-in user and their browser session"""
+    conversation_id = flask_session.get('conversation_id')
+    if conversation_id is None:
+        conversation_id = flask_session['conversation_id'] = uuid.uuid4().hex
+    return f"{namespace}:{current_user.get_id()}:{conversation_id}"
@@ -0,0 +1,156 @@
+from collections import deque
+import logging
+import threading
+import time
+import requests
+from http_client import UpstreamError
+
+logger = logging.getLogger(__name__)
+
+# Breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name, retry_after=None):
+        super().__init__(
+            f"{name} is temporarily unavailable, please try again later",
+            status_code=503,
+            retry_after=retry_after,
+            retryable=False
+        )
+
+
+def is_upstream_failure(error):
+    """Count only errors that suggest the upstream itself is unhealthy"""
+    if isinstance(error, UpstreamError):
+        return error.retryable
+    return isinstance(error, (requests.exceptions.RequestException, ConnectionError, TimeoutError))
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by the failure rate over a sliding window"""
+
+    def __init__(self, name, failure_rate=0.5, min_calls=5, window=60, reset_timeout=30,
+                 half_open_max_calls=1):
+        self.name = name
+        self.failure_rate = failure_rate  # Failure ratio that opens the breaker
+        self.min_calls = min_calls  # Calls needed in the window before the ratio counts
+        self.window = window  # Sliding window length in seconds
+        self.reset_timeout = reset_timeout  # Seconds to stay open before trial calls
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self._results = deque()  # (timestamp, failed) pairs inside the window
+        self._opened_at = None
+        self._trial_calls = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self):
+        """Return whether a call may go to the upstream right now"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._trial_calls = 0
+            if self.state == HALF_OPEN:
+                if self._trial_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._trial_calls += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._close()
+                return
+            self._record(False)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._record(True)
+            failures = sum(1 for _, failed in self._results if failed)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_rate:
+                self._open()
+
+    def retry_after(self):
+        """Seconds until the breaker will admit a trial call"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def _record(self, failed):
+        now = time.monotonic()
+        self._results.append((now, failed))
+        while self._results and now - self._results[0][0] > self.window:
+            self._results.popleft()
+
+    def _open(self):
+        if self.state != OPEN:
+            self.times_opened += 1
+            logger.warning("Circuit breaker opened for %s", self.name)
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._results.clear()
+
+    def _close(self):
+        self.state = CLOSED
+        self._results.clear()
+        self._trial_calls = 0
+        logger.info("Circuit breaker closed for %s", self.name)
+
+    def __enter__(self):
+        if not self.allow():
+            raise CircuitOpenError(self.name, retry_after=self.retry_after())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and is_upstream_failure(exc):
+            self.record_failure()
+        else:
+            self.record_success()
+        return False
+
+    def stats(self):
+        """Return breaker state for monitoring"""
+        with self._lock:
+            failures = sum(1 for _, failed in self._results if failed)
+            return {
+                'state': self.state,
+                'window_calls': len(self._results),
+                'window_failures': failures,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **kwargs):
+    """Return the process-wide breaker for an upstream, creating it on first use"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+def all_stats():
+    """Return the state of every registered breaker"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
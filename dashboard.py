@@ -1,16 +1,91 @@
-from flask import Blueprint, render_template, jsonify
-from flask_login import login_required
+from flask import Blueprint, render_template, jsonify, request
+from flask_login import login_required, current_user
 import requests
 import os
 from datetime import datetime, timedelta
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait
 import json
+import logging
+import queue
+import threading
+import time
+from cache import TTLCache, SharedTTLCache
+import http_client
+from streaming import format_sse, event_stream_response
+from circuit_breaker import get_breaker, CircuitOpenError
+from singleflight import SingleFlight
+from rate_budget import get_bucket
+from watchlists import WatchlistStore
+from shared_state import get_store
+from lazy import Lazy
+import metrics
 
 dashboard_bp = Blueprint('dashboard_bp', __name__)
+logger = logging.getLogger(__name__)
 
 # Configuration
 ALPHA_VANTAGE_API_KEY = os.environ.get('ALPHA_VANTAGE_API_KEY')
+ALPHA_VANTAGE_URL = os.environ.get('ALPHA_VANTAGE_URL', 'https://www.alphavantage.co/query')  # Overridable for local stubs
 REQUEST_TIMEOUT = 10  # Request timeout in seconds
+QUOTE_BATCH_TIMEOUT = 5  # Deadline for a whole batch of quotes in seconds
+MAX_QUOTE_WORKERS = 8  # Maximum concurrent upstream quote requests
+QUOTE_CACHE_TTL = 60  # Seconds a quote is considered fresh
+QUOTE_STALE_TTL = 300  # Seconds an expired quote may still be served while it is refreshed
+QUOTE_NEGATIVE_TTL = 15  # Seconds to wait before retrying a failed or rate-limited quote
+QUOTE_CACHE_SIZE = 10000  # Distinct symbols kept in the shared quote store
+QUOTE_RETAIN = 86400  # Seconds an expired quote stays in a shared store as the last known price
+WATCHLIST_DB = os.environ.get('WATCHLIST_DB', 'watchlists.db')  # SQLite file holding per-user watchlists
+REFRESH_INTERVAL = 15  # Seconds between refresher ticks; each tick spends the quota accrued since the last
+NEWS_REFRESH_INTERVAL = 900  # Seconds between news feed refreshes
+NEWS_RETRY_INTERVAL = 60  # Seconds before retrying a failed news refresh
+ALPHA_VANTAGE_CALLS_PER_MINUTE = int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_MINUTE', 5))  # Free tier quota
+# REALTIME_BULK_QUOTES fetches up to BULK_QUOTE_LIMIT symbols per call but needs a premium key
+ALPHA_VANTAGE_BULK_QUOTES = os.environ.get('ALPHA_VANTAGE_BULK_QUOTES', 'false').lower() == 'true'
+BULK_QUOTE_LIMIT = 100
+# /dashboard/stream holds a connection open for as long as the page is; servers that give each
+# request a worker of its own turn it off, and the page polls /dashboard/update_data instead
+DASHBOARD_STREAMING = os.environ.get('DASHBOARD_STREAMING', 'true').lower() == 'true'
+STREAM_HEARTBEAT = 15  # Seconds between keep-alive comments on idle streams
+STREAM_QUEUE_SIZE = 16  # Pending updates buffered per stream subscriber
+
+# Default watchlist for users who haven't saved their own
+IMPORTANT_US_STOCK_TICKERS = [
+    "AAPL", 
+    "MSFT", 
+    "AMZN", 
+    "GOOG", 
+    "META", 
+    "TSLA", 
+    "NVDA", 
+]
+
+# Shared worker pool for quote fan-out, bounded so refreshes can't pile up threads
+quote_executor = ThreadPoolExecutor(max_workers=MAX_QUOTE_WORKERS, thread_name_prefix='quote')
+
+# Fail fast to mock data while Alpha Vantage is down
+alpha_vantage_breaker = get_breaker('alpha_vantage')
+
+# Concurrent requests for the same quote or feed share one upstream call
+alpha_vantage_flight = SingleFlight()
+
+# Every Alpha Vantage call spends a token from this key's quota, counted in the shared
+# state backend so workers share it
+alpha_vantage_budget = Lazy(lambda: get_bucket(
+    ALPHA_VANTAGE_API_KEY, ALPHA_VANTAGE_CALLS_PER_MINUTE, store=get_store()
+))
+
+def open_quote_cache():
+    """Quote cache in the shared state backend if there is one, so workers warm it once"""
+    store = get_store()
+    if store.shared:
+        return SharedTTLCache(store, 'quote:', ttl=QUOTE_CACHE_TTL, stale_ttl=QUOTE_STALE_TTL, retain=QUOTE_RETAIN)
+    return TTLCache(maxsize=QUOTE_CACHE_SIZE, ttl=QUOTE_CACHE_TTL, stale_ttl=QUOTE_STALE_TTL)
+
+# Quote cache with expiry, shared by every watchlist
+quote_cache = Lazy(open_quote_cache)
+
+# When this worker last attempted each symbol's quote
+quote_attempted_at = {}
 
 # Mock data (used when API is unavailable)
 MOCK_DATA = {
@@ -38,106 +113,446 @@ MOCK_DATA = {
     ]
 }
 
-@lru_cache(maxsize=128)
-def get_stock_price(symbol):
-    """Get real-time stock price"""
-    if not ALPHA_VANTAGE_API_KEY:
-        print(f"Warning: Alpha Vantage API key not set, using mock data")
-        return MOCK_DATA['stock_prices'].get(symbol)
-        
+def fetch_stock_price(symbol):
+    """Fetch a stock price from Alpha Vantage, returning (price, is_real_quote)"""
+    if not alpha_vantage_budget().try_acquire():
+        logger.info("Alpha Vantage quota exhausted, skipping stock price for %s", symbol)
+        return None, False
+
     try:
-        url = f'https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}'
-        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
+        url = f'{ALPHA_VANTAGE_URL}?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}'
+        with alpha_vantage_breaker:
+            response = http_client.get(url, timeout=REQUEST_TIMEOUT,
+                                       upstream='alpha_vantage', operation='GLOBAL_QUOTE')
+            response.raise_for_status()
         data = response.json()
         
         if 'Global Quote' in data:
-            return data['Global Quote']['05. price']
+            return data['Global Quote']['05. price'], True
         elif 'Note' in data:  # API rate limit warning
-            print(f"API Rate Limit Warning: {data['Note']}")
-            return MOCK_DATA['stock_prices'].get(symbol)
+            logger.warning("API Rate Limit Warning: %s", data['Note'])
         else:
-            print(f"Invalid API response format: {data}")
-            return MOCK_DATA['stock_prices'].get(symbol)
+            logger.warning("Invalid API response format: %s", data)
             
+    except CircuitOpenError:
+        logger.info("Alpha Vantage circuit open, skipping stock price for %s", symbol)
+    except requests.exceptions.Timeout:
+        logger.warning("Timeout getting stock price for %s", symbol)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Failed to get stock price for %s: %s", symbol, e)
+    except Exception as e:
+        logger.exception("Error processing stock data for %s: %s", symbol, e)
+    return None, False
+
+def fetch_bulk_quotes(symbols):
+    """Fetch prices for up to BULK_QUOTE_LIMIT symbols in one call, returning {symbol: price}"""
+    if not alpha_vantage_budget().try_acquire():
+        logger.info("Alpha Vantage quota exhausted, skipping bulk quotes")
+        return {}
+
+    try:
+        url = (f'{ALPHA_VANTAGE_URL}?function=REALTIME_BULK_QUOTES'
+               f'&symbol={",".join(symbols)}&apikey={ALPHA_VANTAGE_API_KEY}')
+        with alpha_vantage_breaker:
+            response = http_client.get(url, timeout=REQUEST_TIMEOUT,
+                                       upstream='alpha_vantage', operation='REALTIME_BULK_QUOTES')
+            response.raise_for_status()
+        data = response.json()
+
+        if 'data' in data:
+            return {
+                item['symbol']: item['close'] for item in data['data']
+                if item.get('symbol') and item.get('close')
+            }
+        elif 'Note' in data:  # API rate limit warning
+            logger.warning("API Rate Limit Warning: %s", data['Note'])
+        else:
+            logger.warning("Invalid API response format: %s", data)
+
+    except CircuitOpenError:
+        logger.info("Alpha Vantage circuit open, skipping bulk quotes")
     except requests.exceptions.Timeout:
-        print(f"Timeout getting stock price for {symbol}")
-        return MOCK_DATA['stock_prices'].get(symbol)
+        logger.warning("Timeout getting bulk quotes")
     except requests.exceptions.RequestException as e:
-        print(f"Failed to get stock price for {symbol}: {str(e)}")
-        return MOCK_DATA['stock_prices'].get(symbol)
+        logger.warning("Failed to get bulk quotes: %s", e)
     except Exception as e:
-        print(f"Error processing stock data for {symbol}: {str(e)}")
-        return MOCK_DATA['stock_prices'].get(symbol)
+        logger.exception("Error processing bulk quote data: %s", e)
+    return {}
+
+def store_quote(symbol, price):
+    """Cache a real quote, which also marks the symbol fresh"""
+    quote_cache().set(symbol, price)
+
+def claim(name, ttl):
+    """Take a refresh job for ttl seconds; only one worker sharing the store gets it"""
+    return get_store().incr(f'claim:{name}', ttl=ttl) == 1
+
+def refresh_stock_price(symbol):
+    """Fetch a stock price and store it in the quote cache"""
+    quote_attempted_at[symbol] = time.monotonic()
+    price, ok = alpha_vantage_flight.do(('GLOBAL_QUOTE', symbol), fetch_stock_price, symbol)
+    if ok:
+        store_quote(symbol, price)
+    else:
+        # Negative caching: keep serving the last real quote (or nothing) for a
+        # short while so failures and rate limits don't trigger a retry per tick
+        last_price = quote_cache().peek(symbol)
+        quote_cache().set(symbol, last_price, ttl=QUOTE_NEGATIVE_TTL)
+        price = last_price
+    return price
+
+def current_price(symbol):
+    """Last known quote for a symbol without any upstream call, or mock data"""
+    return current_prices([symbol])[symbol]
+
+def current_prices(symbols):
+    """current_price for many symbols with a single cache lookup"""
+    prices = quote_cache().peek_many(symbols)
+    known = sum(1 for symbol in symbols if prices.get(symbol) is not None)
+    metrics.CACHE_LOOKUPS.inc('last_quote', 'hit', amount=known)
+    metrics.CACHE_LOOKUPS.inc('last_quote', 'miss', amount=len(symbols) - known)
+    return {
+        symbol: prices[symbol] if prices.get(symbol) is not None else MOCK_DATA['stock_prices'].get(symbol)
+        for symbol in symbols
+    }
+
+def due_symbols(symbols):
+    """Symbols without a fresh quote, least recently attempted first"""
+    symbols = list(dict.fromkeys(symbols))
+    fresh = quote_cache().fresh_keys(symbols)
+    never = float('-inf')
+    due = [symbol for symbol in symbols if symbol not in fresh]
+    # A quote that is not fresh needs an upstream call, which is a miss for the hit ratio
+    metrics.CACHE_LOOKUPS.inc('quotes', 'fresh', amount=len(symbols) - len(due))
+    metrics.CACHE_LOOKUPS.inc('quotes', 'miss', amount=len(due))
+    return sorted(due, key=lambda symbol: quote_attempted_at.get(symbol, never))
+
+def refresh_bulk_quotes(symbols):
+    """Refresh a chunk of symbols with a single bulk quote call"""
+    now = time.monotonic()
+    for symbol in symbols:
+        quote_attempted_at[symbol] = now
+    prices = fetch_bulk_quotes(symbols)
+    for symbol, price in prices.items():
+        store_quote(symbol, price)
+
+def refresh_due_quotes(symbols, timeout=QUOTE_BATCH_TIMEOUT):
+    """Spend the quota that is available now on the stalest symbols"""
+    due = due_symbols(symbols)
+    if not due:
+        return
+
+    if ALPHA_VANTAGE_BULK_QUOTES:
+        due = due[:alpha_vantage_budget().available() * BULK_QUOTE_LIMIT]
+        # Other workers sharing the store may be refreshing the same symbols this tick
+        due = [symbol for symbol in due if claim(f'quote:{symbol}', REFRESH_INTERVAL)]
+        chunks = [due[i:i + BULK_QUOTE_LIMIT] for i in range(0, len(due), BULK_QUOTE_LIMIT)]
+        futures = [quote_executor.submit(refresh_bulk_quotes, chunk) for chunk in chunks]
+        wait(futures, timeout=timeout)
+    else:
+        due = due[:alpha_vantage_budget().available()]
+        due = [symbol for symbol in due if claim(f'quote:{symbol}', REFRESH_INTERVAL)]
+        if due:
+            get_stock_prices(due, refresh_stock_price, timeout=timeout)
+
+def get_stock_prices(symbols, fetch, timeout=QUOTE_BATCH_TIMEOUT):
+    """Run fetch for several symbols concurrently within one batch deadline"""
+    futures = {symbol: quote_executor.submit(fetch, symbol) for symbol in dict.fromkeys(symbols)}
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    # Symbols that missed the deadline fall back to the last known price; their requests keep
+    # running in the pool and warm the cache for the next refresh
+    stock_prices = {}
+    for symbol, future in futures.items():
+        if future not in done:
+            logger.info("Batch deadline exceeded getting stock price for %s", symbol)
+            stock_prices[symbol] = current_price(symbol)
+            continue
+        try:
+            price = future.result()
+            stock_prices[symbol] = price if price is not None else current_price(symbol)
+        except Exception as e:
+            logger.warning("Error getting stock price for %s: %s", symbol, e)
+            stock_prices[symbol] = current_price(symbol)
+    return stock_prices
 
 def get_financial_news():
     """Get financial news"""
     if not ALPHA_VANTAGE_API_KEY:
-        print("Warning: Alpha Vantage API key not set, using mock data")
+        logger.warning("Alpha Vantage API key not set, using mock data")
         return MOCK_DATA['news']
-        
+    return alpha_vantage_flight.do(('NEWS_SENTIMENT',), fetch_financial_news)
+
+def fetch_financial_news():
+    """Fetch financial news from Alpha Vantage, falling back to mock data"""
+    if not alpha_vantage_budget().try_acquire():
+        logger.info("Alpha Vantage quota exhausted, using mock news data")
+        return MOCK_DATA['news']
+
     try:
-        url = f'https://www.alphavantage.co/query?function=NEWS_SENTIMENT&apikey={ALPHA_VANTAGE_API_KEY}'
-        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
+        url = f'{ALPHA_VANTAGE_URL}?function=NEWS_SENTIMENT&apikey={ALPHA_VANTAGE_API_KEY}'
+        with alpha_vantage_breaker:
+            response = http_client.get(url, timeout=REQUEST_TIMEOUT,
+                                       upstream='alpha_vantage', operation='NEWS_SENTIMENT')
+            response.raise_for_status()
         data = response.json()
         
         if 'feed' in data:
             return data['feed'][:5]  # Return top 5 news
         elif 'Note' in data:  # API rate limit warning
-            print(f"API Rate Limit Warning: {data['Note']}")
+            logger.warning("API Rate Limit Warning: %s", data['Note'])
             return MOCK_DATA['news']
         else:
-            print(f"Invalid API response format: {data}")
+            logger.warning("Invalid API response format: %s", data)
             return MOCK_DATA['news']
             
+    except CircuitOpenError:
+        logger.info("Alpha Vantage circuit open, using mock news data")
+        return MOCK_DATA['news']
     except requests.exceptions.Timeout:
-        print("Timeout getting news data")
+        logger.warning("Timeout getting news data")
         return MOCK_DATA['news']
     except requests.exceptions.RequestException as e:
-        print(f"Failed to get news data: {str(e)}")
+        logger.warning("Failed to get news data: %s", e)
         return MOCK_DATA['news']
     except Exception as e:
-        print(f"Error processing news data: {str(e)}")
+        logger.exception("Error processing news data: %s", e)
         return MOCK_DATA['news']
 
+def news_key(item):
+    """Identify a news item across refreshes"""
+    return item.get('url') or item.get('title')
+
+def diff_snapshots(previous, current):
+    """Return only the prices that changed and the news items that are new"""
+    stock_prices = {
+        symbol: price for symbol, price in current['stock_prices'].items()
+        if previous['stock_prices'].get(symbol) != price
+    }
+    seen = {news_key(item) for item in previous['news']}
+    news = [item for item in current['news'] if news_key(item) not in seen]
+    if not stock_prices and not news:
+        return None
+    return {
+        'stock_prices': stock_prices,
+        'news': news,
+        'timestamp': current['timestamp']
+    }
+
+class MarketDataRefresher:
+    """Refresh quotes and news into a shared snapshot within the Alpha Vantage quota.
+
+    Each tick refreshes the news feed when it is due and spends whatever
+    quota has accrued on the stalest quotes, so refreshes are spread evenly
+    across the rate-limit window instead of bursting past it.
+    """
+
+    def __init__(self, get_symbols, interval=REFRESH_INTERVAL):
+        self.get_symbols = get_symbols  # Returns the deduplicated set of symbols to keep fresh
+        self.interval = interval
+        self._snapshot = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._subscribers = set()
+        self._news = None
+        self._news_due_at = 0
+
+    def start(self):
+        """Start the refresh thread if it is not already running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='market-data-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh(self):
+        """Fetch quotes and news once and publish them as the new snapshot"""
+        symbols = self.get_symbols()
+        if not ALPHA_VANTAGE_API_KEY:
+            stock_prices = current_prices(symbols)
+            news = get_financial_news()
+        else:
+            # Refresh news alongside the quotes when due, both bounded by the same deadline
+            deadline = time.monotonic() + QUOTE_BATCH_TIMEOUT
+            news_future = None
+            if self._news is None or time.monotonic() >= self._news_due_at:
+                # Use the feed another worker already fetched; otherwise one worker fetches it
+                shared_news = get_store().get('news:feed')
+                if shared_news is not None:
+                    self._news = shared_news
+                    self._news_due_at = time.monotonic() + NEWS_RETRY_INTERVAL
+                elif claim('news', NEWS_RETRY_INTERVAL):
+                    news_future = quote_executor.submit(get_financial_news)
+            refresh_due_quotes(symbols)
+            stock_prices = current_prices(symbols)
+
+            if news_future is not None:
+                done, _ = wait([news_future], timeout=max(0, deadline - time.monotonic()))
+                news = news_future.result() if done else MOCK_DATA['news']
+                failed = news is MOCK_DATA['news']
+                if not failed:
+                    get_store().set('news:feed', news, ttl=NEWS_REFRESH_INTERVAL)
+                if not failed or self._news is None:
+                    self._news = news
+                interval = NEWS_RETRY_INTERVAL if failed else NEWS_REFRESH_INTERVAL
+                self._news_due_at = time.monotonic() + interval
+            news = self._news or MOCK_DATA['news']
+
+        snapshot = {
+            'stock_prices': stock_prices,
+            'news': news,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+        self._ready.set()
+
+        # Subscribers receive the first snapshot when they connect
+        delta = diff_snapshots(previous, snapshot) if previous is not None else None
+        if delta:
+            self._publish(delta)
+        return snapshot
+
+    def subscribe(self):
+        """Register a stream subscriber and return its update queue"""
+        self.start()
+        subscriber = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _publish(self, delta):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(delta)
+            except queue.Full:
+                # Slow or departed client: drop it so it reconnects and receives a fresh snapshot.
+                # Nobody may be draining the queue, so empty it rather than block on it
+                self.unsubscribe(subscriber)
+                try:
+                    while True:
+                        subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscriber.put_nowait(None)
+                except queue.Full:
+                    pass
+
+    def get_snapshot(self, timeout=None):
+        """Return the latest snapshot, waiting up to timeout for the first one"""
+        self.start()
+        if not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            return self._snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.exception("Failed to refresh market data: %s", e)
+            self._stop.wait(self.interval)
+
+# Every symbol is fetched once into the shared store no matter how many users watch it
+watchlist_store = Lazy(lambda: WatchlistStore(WATCHLIST_DB, default_symbols=IMPORTANT_US_STOCK_TICKERS))
+market_data_refresher = MarketDataRefresher(lambda: watchlist_store().all_symbols())
+
+def watchlist_view(data, symbols):
+    """Restrict snapshot or update data to one watchlist, reading the shared store only"""
+    prices = data['stock_prices']
+    # Symbols added since the last refresh are read from the shared store in one lookup
+    missing = current_prices([symbol for symbol in symbols if symbol not in prices])
+    return dict(data, stock_prices={
+        symbol: prices[symbol] if symbol in prices else missing[symbol] for symbol in symbols
+    })
+
+def current_watchlist():
+    return watchlist_store().get(current_user.get_id())
+
 @dashboard_bp.route('/')
 @login_required
 def index():
     """Render dashboard page"""
     try:
-        return render_template('dashboard.html')
+        # Warm the shared snapshot before the page's first data request
+        market_data_refresher.start()
+        return render_template('dashboard.html', streaming=DASHBOARD_STREAMING)
     except Exception as e:
-        print(f"Failed to render dashboard page: {str(e)}")
+        logger.exception("Failed to render dashboard page: %s", e)
         return jsonify({
             'success': False,
             'error': 'Failed to load page, please refresh'
         }), 500
 
+@dashboard_bp.route('/stream')
+@login_required
+def stream():
+    """Push market data changes for the user's watchlist over Server-Sent Events"""
+    if not DASHBOARD_STREAMING:
+        return jsonify({'success': False, 'error': 'Streaming is disabled, poll /dashboard/update_data'}), 404
+    symbols = current_watchlist()
+    watched = set(symbols)
+
+    def generate():
+        # Subscribe only once the stream runs, so the finally below always unsubscribes
+        subscriber = market_data_refresher.subscribe()
+        try:
+            snapshot = market_data_refresher.get_snapshot(timeout=STREAM_HEARTBEAT)
+            while snapshot is None:
+                yield ': keep-alive\n\n'
+                snapshot = market_data_refresher.get_snapshot(timeout=STREAM_HEARTBEAT)
+            yield format_sse('snapshot', watchlist_view(snapshot, symbols))
+
+            while True:
+                try:
+                    delta = subscriber.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if delta is None:
+                    return
+                # Deltas cover every watched symbol; forward only this user's changes
+                prices = {symbol: price for symbol, price in delta['stock_prices'].items() if symbol in watched}
+                if prices or delta.get('news'):
+                    yield format_sse('update', dict(delta, stock_prices=prices))
+        finally:
+            market_data_refresher.unsubscribe(subscriber)
+
+    return event_stream_response(generate())
+
 @dashboard_bp.route('/update_data')
 @login_required
 def update_data():
     """Handle real-time data update requests"""
     try:
-        # Get stock data
-        important_us_stock_tickers = [
-            "AAPL", 
-            "MSFT", 
-            "AMZN", 
-            "GOOG", 
-            "META", 
-            "TSLA", 
-            "NVDA", 
-        ]
-
-        stock_symbols = important_us_stock_tickers
-        stock_prices = {symbol: get_stock_price(symbol) for symbol in stock_symbols}
-        
-        # Get news data
-        news = get_financial_news()
+        # Serve the shared snapshot; upstream calls only happen in the refresher
+        snapshot = market_data_refresher.get_snapshot(timeout=QUOTE_BATCH_TIMEOUT)
+        if snapshot is None:
+            raise ValueError("Market data is not available yet")
+
+        snapshot = watchlist_view(snapshot, current_watchlist())
+        stock_prices = snapshot['stock_prices']
+        news = snapshot['news']
         
         # Validate data
-        if not any(stock_prices.values()):
+        if stock_prices and not any(stock_prices.values()):
             raise ValueError("Failed to get valid stock data")
             
         if not news:
@@ -145,17 +560,40 @@ def update_data():
         
         return jsonify({
             'success': True,
-            'data': {
-                'stock_prices': stock_prices,
-                'news': news,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+            'data': snapshot
         })
         
     except Exception as e:
-        print(f"Failed to update data: {str(e)}")
+        logger.exception("Failed to update data: %s", e)
         return jsonify({
             'success': False,
             'error': f'Data update failed: {str(e)}',
             'data': MOCK_DATA  # Return mock data as fallback
         })
+
+@dashboard_bp.route('/watchlist', methods=['GET', 'PUT'])
+@login_required
+def watchlist():
+    """Get or replace the current user's watchlist"""
+    try:
+        if request.method == 'PUT':
+            data = request.get_json(silent=True) or {}
+            symbols = watchlist_store().set(current_user.get_id(), data.get('symbols'))
+        else:
+            symbols = current_watchlist()
+        return jsonify({'success': True, 'symbols': symbols})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@dashboard_bp.route('/watchlist/<symbol>', methods=['POST', 'DELETE'])
+@login_required
+def watchlist_symbol(symbol):
+    """Add a symbol to or remove it from the current user's watchlist"""
+    try:
+        if request.method == 'POST':
+            symbols = watchlist_store().add(current_user.get_id(), symbol)
+        else:
+            symbols = watchlist_store().remove(current_user.get_id(), symbol)
+        return jsonify({'success': True, 'symbols': symbols})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
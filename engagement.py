@@ -3,31 +3,59 @@ from flask_login import login_required
 import requests
 import os
 from functools import lru_cache, wraps
+import hashlib
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 import time
 import json
-
-load_dotenv()
+import logging
+import random
+import http_client
+from http_client import UpstreamError
+from circuit_breaker import get_breaker
+from cache import TTLCache, SharedTTLCache
+from shared_state import SQLiteStore, get_store
+from lazy import Lazy
+from streaming import wants_event_stream, stream_text_response
+from chat_sessions import ChatSessionManager, conversation_key
+from singleflight import SingleFlight
+from calculators import financial_metrics, format_metrics
+import metrics
 
 engagement_bp = Blueprint('engagement_bp', __name__)
+logger = logging.getLogger(__name__)
 
 # Configuration
 class Config:
     GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-    GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
+    GEMINI_API_URL = os.environ.get(
+        "GEMINI_API_URL",
+        "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
+    )
+    GEMINI_STREAM_URL = os.environ.get(
+        "GEMINI_STREAM_URL",
+        "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:streamGenerateContent"
+    )
     CACHE_TIMEOUT = 300  # Cache timeout in minutes
+    RESPONSE_CACHE_SIZE = 256  # Gemini responses kept in memory
+    RESPONSE_CACHE_PATH = os.environ.get("GEMINI_CACHE_PATH")  # Optional SQLite file to persist responses
+    CHAT_MAX_TOKENS = 2000  # Token budget for the conversation window sent with each message
+    CHAT_IDLE_TIMEOUT = 1800  # Seconds before an idle conversation is dropped
     REQUEST_TIMEOUT = 30  # Request timeout in seconds
     MAX_RETRIES = 3      # Maximum retry attempts
-    RETRY_DELAY = 2      # Retry delay in seconds
+    RETRY_DELAY = 2      # Base retry delay in seconds, doubled on each attempt
+    RETRY_MAX_DELAY = 10  # Upper bound for a single retry delay in seconds
+    RETRY_BUDGET = 45    # Total time in seconds a call may spend including retries
+    SIMULATION_PATHS = 20000  # Monte Carlo return paths per investment simulation
+    SIMULATION_SEED = 42  # Fixed seed so identical inputs give identical (cacheable) results
+    DEFAULT_INFLATION_RATE = 2.5  # Annual inflation in percent when the request gives none
     
-    # Proxy settings (if needed)
+    # Proxy settings (if needed), applied to the pooled Gemini session
     HTTP_PROXY = os.environ.get("HTTP_PROXY")
     HTTPS_PROXY = os.environ.get("HTTPS_PROXY")
 
 # Check API key
 if not Config.GEMINI_API_KEY:
-    print("Warning: GEMINI_API_KEY environment variable not set")
+    logger.warning("GEMINI_API_KEY environment variable not set")
 
 # Proxy settings
 proxies = {}
@@ -36,6 +64,62 @@ if Config.HTTP_PROXY:
 if Config.HTTPS_PROXY:
     proxies['https'] = Config.HTTPS_PROXY
 
+# Fail fast with a 503 while Gemini is down instead of waiting out timeouts
+gemini_breaker = get_breaker('gemini')
+
+def open_response_disk_cache():
+    """Second cache tier: a file that survives restarts if configured, else the shared state backend"""
+    if Config.RESPONSE_CACHE_PATH:
+        return SharedTTLCache(SQLiteStore(Config.RESPONSE_CACHE_PATH), 'gemini:', ttl=Config.CACHE_TIMEOUT * 60)
+    if get_store().shared:
+        return SharedTTLCache(get_store(), 'gemini:', ttl=Config.CACHE_TIMEOUT * 60)
+    return None
+
+# Gemini response cache: in-memory LRU in front of the optional second tier
+response_cache = TTLCache(maxsize=Config.RESPONSE_CACHE_SIZE, ttl=Config.CACHE_TIMEOUT * 60)
+response_disk_cache = Lazy(open_response_disk_cache)
+
+# Identical prompts in flight at the same time share one Gemini call
+gemini_flight = SingleFlight()
+
+# Server-side conversation windows for /chat, kept in the shared state backend when it is shared
+chat_sessions = ChatSessionManager(
+    max_tokens=Config.CHAT_MAX_TOKENS, idle_ttl=Config.CHAT_IDLE_TIMEOUT, store=get_store
+)
+
+def metrics_prompt(metrics):
+    """Prompt section stating locally computed figures so Gemini doesn't redo the arithmetic"""
+    lines = format_metrics(metrics)
+    if not lines:
+        return ""
+    return f"\nComputed Metrics (exact figures, use as given without recalculating):\n{lines}\n"
+
+PROFILE_FIELDS = ['age', 'occupation', 'monthly_income', 'monthly_expenses', 'assets', 'risk_preference']
+
+def build_profile_prompt(data):
+    """Build the profile analysis prompt and the metrics stated in it"""
+    prompt = """As a professional financial advisor, please provide a comprehensive user profile analysis and personalized financial advice based on the following information.
+Please analyze from these aspects:
+
+1. Basic Financial Status Analysis
+2. Income and Expense Structure Assessment
+3. Risk Tolerance Assessment
+4. Investment Recommendations
+5. Financial Goal Planning
+6. Risk Warnings
+
+User Information:
+"""
+    for field in PROFILE_FIELDS:
+        prompt += f"{field}: {data.get(field, '')}\n"
+    metrics = financial_metrics(
+        income=data.get('monthly_income'),
+        expenses=data.get('monthly_expenses'),
+        assets=data.get('assets')
+    )
+    prompt += metrics_prompt(metrics)
+    return prompt, metrics
+
 # Unified response format
 def make_response(success=True, data=None, message=None, status_code=200):
     response = {
@@ -46,25 +130,52 @@ def make_response(success=True, data=None, message=None, status_code=200):
     }
     return jsonify(response), status_code
 
+def is_retryable(error):
+    """Only transient upstream failures are worth retrying"""
+    if isinstance(error, UpstreamError):
+        return error.retryable
+    return isinstance(error, (ConnectionError, TimeoutError))
+
 # Add retry decorator
-def retry_on_failure(max_retries=3, delay=1):
+def retry_on_failure(max_retries=3, delay=1, max_delay=None, budget=None):
+    """Retry transient failures with jittered exponential backoff within a time budget"""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            started = time.monotonic()
             retries = 0
-            while retries < max_retries:
+            while True:
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
                     retries += 1
-                    if retries == max_retries:
-                        raise e
-                    time.sleep(delay)
-            return None
+                    if retries >= max_retries or not is_retryable(e):
+                        raise
+
+                    # Full jitter spreads retries from concurrent callers apart
+                    backoff = delay * (2 ** (retries - 1))
+                    if max_delay is not None:
+                        backoff = min(backoff, max_delay)
+                    wait = random.uniform(0, backoff)
+                    retry_after = getattr(e, 'retry_after', None)
+                    if retry_after is not None:
+                        wait = max(wait, retry_after)
+
+                    # Give up rather than sleep past the overall budget
+                    if budget is not None and time.monotonic() - started + wait > budget:
+                        raise
+                    logger.info("Retrying %s in %.2fs after error: %s", func.__name__, wait, e)
+                    metrics.UPSTREAM_RETRIES.inc(func.__name__)
+                    time.sleep(wait)
         return wrapper
     return decorator
 
-@retry_on_failure(max_retries=Config.MAX_RETRIES, delay=Config.RETRY_DELAY)
+@retry_on_failure(
+    max_retries=Config.MAX_RETRIES,
+    delay=Config.RETRY_DELAY,
+    max_delay=Config.RETRY_MAX_DELAY,
+    budget=Config.RETRY_BUDGET
+)
 def get_gemini_response(prompt):
     """Get response from Google Gemini API"""
     if not Config.GEMINI_API_KEY:
@@ -87,32 +198,35 @@ def get_gemini_response(prompt):
         
         # Send request
         try:
-            print(f"Sending request to Gemini API...")  # Debug log
-            response = requests.post(
-                url, 
-                json=payload, 
-                headers=headers, 
-                timeout=Config.REQUEST_TIMEOUT,
-                proxies=proxies if proxies else None,
-                verify=True  # SSL verification
-            )
-            print(f"Received response, status code: {response.status_code}")  # Debug log
-            
-            # Check response status code
-            response.raise_for_status()
+            with gemini_breaker:
+                response = http_client.post(
+                    url, 
+                    json=payload, 
+                    headers=headers, 
+                    timeout=Config.REQUEST_TIMEOUT,
+                    proxies=proxies if proxies else None,
+                    verify=True,  # SSL verification
+                    upstream='gemini',
+                    operation='generateContent'
+                )
+                
+                # Check response status code
+                if response.status_code >= 400:
+                    raise UpstreamError.from_response(
+                        response, f"API request failed with status {response.status_code}"
+                    )
             
             # Check response Content-Type
             content_type = response.headers.get('Content-Type', '')
             if 'application/json' not in content_type:
-                print(f"Invalid Content-Type: {content_type}")  # Debug log
+                logger.debug("Invalid Content-Type: %s", content_type)
                 raise ValueError(f"API returned non-JSON response: {content_type}")
             
             # Try to parse JSON
             try:
                 result = response.json()
-                print("Successfully parsed JSON response")  # Debug log
             except ValueError as e:
-                print(f"JSON parsing error: {str(e)}")  # Debug log
+                logger.debug("JSON parsing error: %s", e)
                 raise ValueError(f"Unable to parse API response as JSON: {str(e)}")
             
             # Validate response structure
@@ -120,26 +234,146 @@ def get_gemini_response(prompt):
                 raise ValueError("Invalid API response format")
                 
             if 'candidates' not in result or not result['candidates']:
-                print(f"Response missing required fields: {result}")  # Debug log
+                logger.debug("Response missing required fields: %s", result)
                 raise ValueError("API response missing required data fields")
                 
             if not result['candidates'][0].get('content', {}).get('parts', []):
                 raise ValueError("API response missing text content")
             
             response_text = result['candidates'][0]['content']['parts'][0]['text']
-            print("Successfully retrieved response text")  # Debug log
             return response_text
             
         except requests.exceptions.Timeout:
-            print("Request timeout")  # Debug log
-            raise ConnectionError("API request timeout, please try again later")
+            raise UpstreamError("API request timeout, please try again later")
         except requests.exceptions.RequestException as e:
-            print(f"Request exception: {str(e)}")  # Debug log
-            raise ConnectionError(f"API request failed: {str(e)}")
+            raise UpstreamError(f"API request failed: {str(e)}")
             
     except Exception as e:
-        print(f"Gemini API error: {str(e)}")  # Debug log
-        raise Exception(f"Error processing request: {str(e)}")
+        # Re-raise unchanged so the retry policy can classify the error
+        logger.warning("Gemini API error: %s", e)
+        raise
+
+def stream_gemini_response(prompt):
+    """Yield response text chunks from Google Gemini API as they are generated"""
+    if not Config.GEMINI_API_KEY:
+        raise ValueError("System configuration error: Missing API key, please contact administrator")
+
+    payload = {
+        "contents": [{
+            "parts": [{
+                "text": prompt
+            }]
+        }]
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream"
+    }
+    url = f"{Config.GEMINI_STREAM_URL}?alt=sse&key={Config.GEMINI_API_KEY}"
+
+    # Streams are not retried: a failure after the first chunk can't be replayed
+    try:
+        with gemini_breaker:
+            response = http_client.post(
+                url,
+                json=payload,
+                headers=headers,
+                timeout=Config.REQUEST_TIMEOUT,
+                proxies=proxies if proxies else None,
+                stream=True,
+                upstream='gemini',
+                operation='streamGenerateContent'
+            )
+            if response.status_code >= 400:
+                response.close()
+                raise UpstreamError.from_response(
+                    response, f"API request failed with status {response.status_code}"
+                )
+    except requests.exceptions.Timeout:
+        raise UpstreamError("API request timeout, please try again later")
+    except requests.exceptions.RequestException as e:
+        raise UpstreamError(f"API request failed: {str(e)}")
+
+    with response:
+        response.encoding = 'utf-8'
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            result = json.loads(line[len('data:'):])
+            for candidate in result.get('candidates', [])[:1]:
+                for part in candidate.get('content', {}).get('parts', []):
+                    if part.get('text'):
+                        yield part['text']
+
+def prompt_cache_key(prompt):
+    """Hash a prompt after normalizing whitespace, scoped to the configured model"""
+    normalized = ' '.join(prompt.split())
+    return hashlib.sha256(f"{Config.GEMINI_API_URL}\n{normalized}".encode('utf-8')).hexdigest()
+
+def lookup_cached_response(key):
+    """Return a cached response text, or None"""
+    response_text, state = response_cache.get(key)
+    metrics.CACHE_LOOKUPS.inc('gemini_memory', state or 'miss')
+    if state is not None:
+        return response_text
+
+    disk_cache = response_disk_cache()
+    if disk_cache is not None:
+        try:
+            response_text, state = disk_cache.get(key)
+        except Exception as e:
+            logger.warning("Failed to read cached response: %s", e)
+            state = None
+        metrics.CACHE_LOOKUPS.inc('gemini_disk', state or 'miss')
+        if state is not None:
+            response_cache.set(key, response_text)
+            return response_text
+    return None
+
+def store_cached_response(key, response_text):
+    """Store a response text in the memory and disk caches"""
+    if not response_text:
+        return
+    response_cache.set(key, response_text)
+    disk_cache = response_disk_cache()
+    if disk_cache is not None:
+        try:
+            disk_cache.set(key, response_text)
+        except Exception as e:
+            logger.warning("Failed to persist cached response: %s", e)
+
+def get_cached_gemini_response(prompt):
+    """Get a Gemini response, reusing a cached one for an identical prompt"""
+    key = prompt_cache_key(prompt)
+    response_text = lookup_cached_response(key)
+    if response_text is not None:
+        return response_text
+
+    def load():
+        response_text = get_gemini_response(prompt)
+        store_cached_response(key, response_text)
+        return response_text
+
+    return gemini_flight.do(key, load)
+
+def stream_cached_gemini_response(prompt):
+    """Stream a Gemini response, replaying a cached one for an identical prompt"""
+    key = prompt_cache_key(prompt)
+    response_text = lookup_cached_response(key)
+    if response_text is not None:
+        yield response_text
+        return
+
+    parts = []
+    for text in stream_gemini_response(prompt):
+        parts.append(text)
+        yield text
+    store_cached_response(key, ''.join(parts))
+
+@engagement_bp.errorhandler(UpstreamError)
+def upstream_error_handler(e):
+    """Report upstream failures, including open circuits, as 503 responses"""
+    return make_response(success=False, message=str(e), status_code=503)
 
 @engagement_bp.route('/')
 @login_required
@@ -177,8 +411,7 @@ def analyze_profile():
                 status_code=400
             )
             
-        required_fields = ['age', 'occupation', 'monthly_income', 'monthly_expenses', 'assets', 'risk_preference']
-        missing_fields = [field for field in required_fields if not data.get(field)]
+        missing_fields = [field for field in PROFILE_FIELDS if not data.get(field)]
         if missing_fields:
             return make_response(
                 success=False, 
@@ -187,23 +420,10 @@ def analyze_profile():
             )
 
         # Build detailed prompt
-        prompt = """As a professional financial advisor, please provide a comprehensive user profile analysis and personalized financial advice based on the following information.
-Please analyze from these aspects:
-
-1. Basic Financial Status Analysis
-2. Income and Expense Structure Assessment
-3. Risk Tolerance Assessment
-4. Investment Recommendations
-5. Financial Goal Planning
-6. Risk Warnings
-
-User Information:
-"""
-        for field in required_fields:
-            prompt += f"{field}: {data.get(field, '')}\n"
+        prompt, metrics = build_profile_prompt(data)
         
         try:
-            analysis = get_gemini_response(prompt)
+            analysis = get_cached_gemini_response(prompt)
             if not analysis:
                 return make_response(
                     success=False,
@@ -215,6 +435,7 @@ User Information:
             session['user_profile'] = {
                 'analysis': analysis,
                 'raw_data': data,
+                'metrics': metrics,
                 'timestamp': datetime.now().isoformat()
             }
 
@@ -223,20 +444,23 @@ User Information:
                 data={
                     "analysis": analysis,
                     "profile_data": data,
+                    "metrics": metrics,
                     "timestamp": datetime.now().isoformat()
                 }
             )
             
         except (ConnectionError, ValueError) as e:
-            print(f"Analysis generation error: {str(e)}")
+            logger.exception("Analysis generation error: %s", e)
+            # The computed metrics don't depend on Gemini, so return them anyway
             return make_response(
                 success=False,
+                data={"metrics": metrics},
                 message=f"Failed to generate analysis: {str(e)}",
                 status_code=503
             )
         
     except Exception as e:
-        print(f"Request processing error: {str(e)}")
+        logger.exception("Request processing error: %s", e)
         return make_response(
             success=False, 
             message=f"Error processing request: {str(e)}", 
@@ -253,9 +477,20 @@ def financial_advice():
     prompt += f"Expenses: {data.get('expenses', '')}\n"
     prompt += f"Assets: {data.get('assets', '')}\n"
     prompt += f"Risk Profile: {data.get('risk_profile', '')}\n"
+    metrics = financial_metrics(
+        income=data.get('income'),
+        expenses=data.get('expenses'),
+        assets=data.get('assets')
+    )
+    prompt += metrics_prompt(metrics)
     
-    ai_response = get_gemini_response(prompt)
-    return make_response(data={"financial_advice": ai_response})
+    try:
+        ai_response = get_cached_gemini_response(prompt)
+    except (UpstreamError, ValueError) as e:
+        # A missing key or an unusable reply fails the same way as an outage; the metrics still stand
+        logger.warning("Gemini response unavailable: %s", e)
+        return make_response(success=False, data={"metrics": metrics}, message=str(e), status_code=503)
+    return make_response(data={"financial_advice": ai_response, "metrics": metrics})
 
 @engagement_bp.route('/chat', methods=['POST'])
 @login_required
@@ -266,9 +501,19 @@ def chat():
         return make_response(success=False, message="Missing message", status_code=400)
     
     message = data['message']
-    conversation_history = data.get('conversation_history', '')
+
+    # Context comes from the server-side session, not a history string resent by the client
+    conversation = chat_sessions.get(conversation_key('engagement'))
+    prompt = conversation.prompt(message)
+
+    if wants_event_stream():
+        return stream_text_response(
+            stream_gemini_response(prompt),
+            on_complete=lambda reply: chat_sessions.record(conversation, message, reply)
+        )
     
-    response = get_gemini_response(conversation_history + "\nUser: " + message)
+    response = get_gemini_response(prompt)
+    chat_sessions.record(conversation, message, response)
     return make_response(data={"response": response})
 
 @engagement_bp.route('/custom_plan', methods=['POST'])
@@ -288,9 +533,22 @@ def custom_plan():
                    f"Expenses {current_finance.get('expenses', '')}, "
                    f"Assets {current_finance.get('assets', '')}, "
                    f"Risk Profile {current_finance.get('risk_profile', '')}\n")
+    metrics = financial_metrics(
+        income=current_finance.get('income'),
+        expenses=current_finance.get('expenses'),
+        assets=current_finance.get('assets'),
+        target_amount=data.get('target_amount'),
+        time_horizon=data.get('time_horizon')
+    )
+    prompt += metrics_prompt(metrics)
     
-    ai_response = get_gemini_response(prompt)
-    return make_response(data={"custom_plan": ai_response})
+    try:
+        ai_response = get_cached_gemini_response(prompt)
+    except (UpstreamError, ValueError) as e:
+        # A missing key or an unusable reply fails the same way as an outage; the metrics still stand
+        logger.warning("Gemini response unavailable: %s", e)
+        return make_response(success=False, data={"metrics": metrics}, message=str(e), status_code=503)
+    return make_response(data={"custom_plan": ai_response, "metrics": metrics})
 
 @engagement_bp.route('/simulation', methods=['POST'])
 @login_required
@@ -307,10 +565,17 @@ def simulation():
                 status_code=400
             )
 
-        # Get parameters
+        # Get parameters; rates are percentages
         initial_amount = float(data["initial_amount"])
         annual_rate = float(data["annual_rate"])
         years = int(data["years"])
+        monthly_contribution = float(data.get("monthly_contribution") or 0)
+        annual_fee = float(data.get("annual_fee") or 0)
+        inflation_rate = data.get("inflation_rate")
+        inflation_rate = Config.DEFAULT_INFLATION_RATE if inflation_rate in (None, '') else float(inflation_rate)
+        target_amount = float(data["target_amount"]) if data.get("target_amount") else None
+        if not 1 <= years <= 50:
+            raise ValueError("Investment period must be between 1 and 50 years")
 
         # Get user profile
         user_profile = session.get('user_profile', {}).get('raw_data', {})
@@ -321,9 +586,24 @@ def simulation():
                 status_code=400
             )
 
-        # Basic return calculation
-        future_value = initial_amount * ((1 + annual_rate/100) ** years)
-        monthly_investment = initial_amount / (12 * years) if years > 0 else 0
+        # Simulate locally so the advice is grounded in real numbers; NumPy loads on first use
+        import simulation as portfolio_simulation
+        volatility = data.get("annual_volatility")
+        volatility = float(volatility) / 100 if volatility else \
+            portfolio_simulation.risk_volatility(user_profile.get('risk_preference'))
+        result = portfolio_simulation.simulate(
+            initial_amount, years, annual_rate / 100,
+            monthly_contribution=monthly_contribution,
+            annual_volatility=volatility,
+            annual_fee=annual_fee / 100,
+            inflation=inflation_rate / 100,
+            target=target_amount,
+            paths=Config.SIMULATION_PATHS,
+            seed=Config.SIMULATION_SEED
+        )
+        future_value = result['expected_final_amount']
+        final_range = result['final_percentiles']
+        real_range = result['real_final_percentiles']
 
         # Generate investment advice prompt
         prompt = f"""As a professional investment advisor, please create a detailed investment plan based on the following user information and investment parameters:
@@ -338,11 +618,17 @@ User Profile Information:
 
 Investment Parameters:
 - Planned Investment Amount: ${initial_amount:,.2f}
+- Monthly Contribution: ${monthly_contribution:,.2f}
 - Expected Annual Return Rate: {annual_rate}%
+- Annual Fees: {annual_fee}%
 - Investment Period: {years} years
-- Monthly Average Investment: ${monthly_investment:,.2f}
 - Expected Final Amount: ${future_value:,.2f}
 
+Monte Carlo Simulation ({result['paths']:,} paths, {volatility * 100:.0f}% annual volatility, {inflation_rate}% inflation):
+- Final Amount, 10th/50th/90th percentile: ${final_range['p10']:,.2f} / ${final_range['p50']:,.2f} / ${final_range['p90']:,.2f}
+- In Today's Money, 10th/50th/90th percentile: ${real_range['p10']:,.2f} / ${real_range['p50']:,.2f} / ${real_range['p90']:,.2f}
+- Probability of Ending Below ${result['target_amount']:,.2f} in Today's Money: {result['shortfall_probability']:.0%}
+
 Please provide the following detailed advice:
 1. Investment Portfolio Allocation (based on user risk preference)
 2. Specific Investment Product Recommendations and Ratios
@@ -357,31 +643,41 @@ Please provide the following detailed advice:
 
 Please ensure the advice fully aligns with the user's risk tolerance and financial status."""
 
+        # Build complete investment plan
+        investment_plan = {
+            "initial_investment": initial_amount,
+            "annual_return_rate": annual_rate,
+            "investment_period": years,
+            "monthly_investment": monthly_contribution,
+            "projected_final_amount": future_value,
+            "simulation": result,
+            "user_profile_summary": {
+                "age": user_profile.get('age'),
+                "risk_preference": user_profile.get('risk_preference'),
+                "monthly_income": user_profile.get('monthly_income')
+            }
+        }
+
+        if wants_event_stream():
+            # Relay advice as it is generated; the full plan follows in the final event
+            def complete_plan(investment_advice):
+                if not investment_advice:
+                    raise ValueError("Unable to generate investment advice")
+                return dict(investment_plan, detailed_plan=investment_advice)
+
+            return stream_text_response(stream_cached_gemini_response(prompt), on_complete=complete_plan)
+
         try:
             # Get AI advice
-            investment_advice = get_gemini_response(prompt)
+            investment_advice = get_cached_gemini_response(prompt)
             if not investment_advice:
                 raise ValueError("Unable to generate investment advice")
 
-            # Build complete investment plan
-            investment_plan = {
-                "initial_investment": initial_amount,
-                "annual_return_rate": annual_rate,
-                "investment_period": years,
-                "monthly_investment": monthly_investment,
-                "projected_final_amount": future_value,
-                "user_profile_summary": {
-                    "age": user_profile.get('age'),
-                    "risk_preference": user_profile.get('risk_preference'),
-                    "monthly_income": user_profile.get('monthly_income')
-                },
-                "detailed_plan": investment_advice
-            }
-
+            investment_plan["detailed_plan"] = investment_advice
             return make_response(data=investment_plan)
 
         except Exception as e:
-            print(f"Error generating investment advice: {str(e)}")
+            logger.exception("Error generating investment advice: %s", e)
             return make_response(
                 success=False,
                 message="Failed to generate investment advice, please try again later",
@@ -395,7 +691,7 @@ Please ensure the advice fully aligns with the user's risk tolerance and financi
             status_code=400
         )
     except Exception as e:
-        print(f"Request processing error: {str(e)}")
+        logger.exception("Request processing error: %s", e)
         return make_response(
             success=False,
             message="Error processing request, please try again later",
@@ -0,0 +1,90 @@
+"""
+Gunicorn production profile.
+
+Every blueprint spends most of a request waiting on Gemini or Alpha
+Vantage, so workers default to gevent: one cooperative event loop per CPU
+core, each holding many requests in flight. Set GUNICORN_WORKER_CLASS=sync
+to fall back to one request per worker; that turns off the dashboard's
+Server-Sent Events stream, whose open connections would take up every sync
+worker and be killed at `timeout`, and the dashboard polls instead.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+# Load .env before anything below reads the environment or imports app modules; Config reads
+# its settings at import, long before app.py would load the file
+load_dotenv()
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+
+if worker_class == 'gevent':
+    # The app is preloaded in the master, so patch before it imports sockets, ssl or threading
+    from gevent import monkey
+    monkey.patch_all()
+    # The Gemini SDK defaults to gRPC, which does not cooperate with gevent
+    os.environ.setdefault('GEMINI_TRANSPORT', 'rest')
+else:
+    # A stream would hold a sync worker until `timeout` kills it
+    os.environ['DASHBOARD_STREAMING'] = 'false'
+
+# Rate limits, caches and the Alpha Vantage quota must be shared by all workers to be correct
+os.environ.setdefault('SHARED_STATE_URL', 'sqlite:///shared_state.db')
+
+# Workers write their metric totals here so /metrics reports all of them, whichever serves it
+os.environ.setdefault('METRICS_DIR', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    f"gunicorn-metrics-{os.getenv('PORT', 8000)}"
+))
+
+from engagement import Config
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 8000)}"
+
+# gevent workers are I/O bound, so one per core suffices; sync workers need the classic 2n + 1.
+# At least two, so one keeps serving while another is recycled
+if worker_class == 'gevent':
+    workers = int(os.getenv('WEB_CONCURRENCY', max(2, cpu_count)))
+else:
+    workers = int(os.getenv('WEB_CONCURRENCY', cpu_count * 2 + 1))
+worker_connections = int(os.getenv('GEVENT_MAX_CONNECTIONS', 1000))  # Concurrent requests per gevent worker
+
+# Import the app once in the master; workers fork with it loaded, so boot and respawn are fast
+preload_app = True
+
+# A Gemini call may retry for up to RETRY_BUDGET seconds and its last attempt may take another
+# REQUEST_TIMEOUT, so only a worker silent for longer than that is considered stuck
+timeout = Config.RETRY_BUDGET + Config.REQUEST_TIMEOUT
+# On restart or recycling, in-flight requests get one upstream timeout to finish
+graceful_timeout = Config.REQUEST_TIMEOUT
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Keep worker heartbeats off disk where shared memory is available
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None  # Empty disables the access log
+errorlog = '-'
+
+
+def on_starting(server):
+    """Drop metric totals left by a previous run of the server"""
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    """Drop pooled upstream connections inherited from the master; each worker opens its own"""
+    import http_client
+    http_client.close_all()
@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+import json
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryStore:
+    """Append-only JSON Lines history with an in-memory index of line offsets.
+
+    Appends cost one write regardless of history size and are serialized
+    across processes with a lock file. Each record's id is its line number,
+    so pages can be read by seeking straight to the indexed offsets.
+    Appends made by other processes are picked up on the next read.
+    """
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._offsets = []  # Byte offset of each complete line
+        self._indexed_size = 0
+        self._lock = threading.Lock()
+        if legacy_path and not os.path.exists(path) and os.path.exists(legacy_path):
+            try:
+                self._migrate(legacy_path)
+            except (OSError, ValueError) as e:
+                logger.warning("Failed to migrate history from %s: %s", legacy_path, e)
+
+    @contextmanager
+    def _file_lock(self):
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _migrate(self, legacy_path):
+        """Convert a legacy JSON array file, replacing the target atomically"""
+        with self._file_lock():
+            if os.path.exists(self.path):
+                return
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for item in items:
+                    f.write(json.dumps(item, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def _sync_index(self):
+        """Index lines appended since the last call, including other processes' appends"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size <= self._indexed_size:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._indexed_size)
+            data = f.read(size - self._indexed_size)
+        position = 0
+        # Only index complete lines; a partial line is picked up once finished
+        while True:
+            end = data.find(b'\n', position)
+            if end == -1:
+                break
+            self._offsets.append(self._indexed_size + position)
+            position = end + 1
+        self._indexed_size += position
+
+    def append(self, item):
+        """Append a record and return it with its id"""
+        line = (json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._file_lock():
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self._sync_index()
+            item_id = len(self._offsets) - 1
+        return dict(item, id=item_id)
+
+    def count(self):
+        with self._lock:
+            self._sync_index()
+            return len(self._offsets)
+
+    def read(self, start=0, limit=None):
+        """Return records with ids in [start, start + limit)"""
+        with self._lock:
+            self._sync_index()
+            total = len(self._offsets)
+            start = max(0, min(start, total))
+            end = total if limit is None else min(total, start + max(0, limit))
+            if start >= end:
+                return []
+            first = self._offsets[start]
+            last = self._offsets[end] if end < total else self._indexed_size
+
+        with open(self.path, 'rb') as f:
+            f.seek(first)
+            lines = f.read(last - first).splitlines()
+        return [dict(json.loads(line), id=start + i) for i, line in enumerate(lines)]
@@ -0,0 +1,147 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+
+# Configuration
+DEFAULT_POOL_CONNECTIONS = 4  # Connection pools cached per session
+DEFAULT_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 10))  # Keep-alive connections per host
+
+# Per-host pool sizes for upstreams that see more concurrency
+POOL_SIZES = {
+    'www.alphavantage.co': int(os.environ.get("ALPHA_VANTAGE_POOL_MAXSIZE", 10)),
+    'generativelanguage.googleapis.com': int(os.environ.get("GEMINI_POOL_MAXSIZE", 20)),
+}
+
+# HTTP status codes worth retrying; other 4xx responses will fail the same way again
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Upstream calls slower than this are logged as warnings; all calls are logged at DEBUG
+SLOW_UPSTREAM_SECONDS = float(os.environ.get("SLOW_UPSTREAM_SECONDS", 5))
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(ConnectionError):
+    """Upstream call failed, with the HTTP status and Retry-After hint when known"""
+
+    def __init__(self, message, status_code=None, retry_after=None, retryable=True):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+    @classmethod
+    def from_response(cls, response, message):
+        return cls(
+            message,
+            status_code=response.status_code,
+            retry_after=parse_retry_after(response.headers.get('Retry-After')),
+            retryable=response.status_code in RETRYABLE_STATUS_CODES
+        )
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url, proxies=None):
+    """Return the shared keep-alive session for the host of the given URL"""
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            pool_maxsize = POOL_SIZES.get(host, DEFAULT_POOL_MAXSIZE)
+            adapter = HTTPAdapter(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=pool_maxsize)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            if proxies:
+                session.proxies.update(proxies)
+            _sessions[host] = session
+    return session
+
+
+def request(method, url, proxies=None, upstream=None, operation=None, **kwargs):
+    """Send a request over the pooled session for the URL's host, recording its metrics.
+
+    upstream and operation label the metrics; they default to the host and method.
+    """
+    upstream = upstream or urlsplit(url).netloc
+    operation = operation or method
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        response = get_session(url, proxies).request(method, url, **kwargs)
+        status = str(response.status_code)
+    except requests.exceptions.Timeout:
+        status = 'timeout'
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        metrics.UPSTREAM_LATENCY.observe(duration, upstream, operation)
+        metrics.UPSTREAM_REQUESTS.inc(upstream, operation, status)
+        log_upstream_call(upstream, operation, status, duration)
+
+    body = response.request.body
+    if body is not None:
+        metrics.UPSTREAM_REQUEST_SIZE.observe(len(body), upstream, operation)
+    if not kwargs.get('stream'):
+        metrics.UPSTREAM_RESPONSE_SIZE.observe(len(response.content), upstream, operation)
+    return response
+
+
+def log_upstream_call(upstream, operation, status, duration):
+    level = logging.WARNING if duration >= SLOW_UPSTREAM_SECONDS else logging.DEBUG
+    if logger.isEnabledFor(level):
+        logger.log(level, "%s %s call: %s in %.0f ms", upstream, operation, status, duration * 1000, extra={
+            'upstream': upstream,
+            'operation': operation,
+            'status': status,
+            'duration_ms': round(duration * 1000, 1)
+        })
+
+
+def get(url, proxies=None, **kwargs):
+    """Send a GET request over the pooled session for the URL's host"""
+    return request('GET', url, proxies, **kwargs)
+
+
+def post(url, proxies=None, **kwargs):
+    """Send a POST request over the pooled session for the URL's host"""
+    return request('POST', url, proxies, **kwargs)
+
+
+def close_all():
+    """Close every pooled session, e.g. after forking a worker"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
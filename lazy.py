@@ -0,0 +1,34 @@
+import threading
+
+
+class Lazy:
+    """Build a value on first use instead of at import time.
+
+    Call the instance to get the value; the factory runs once even when
+    several threads ask at the same time.
+    """
+
+    _UNSET = object()
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = self._UNSET
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        value = self._value
+        if value is self._UNSET:
+            with self._lock:
+                value = self._value
+                if value is self._UNSET:
+                    value = self._value = self.factory()
+        return value
+
+    @property
+    def initialized(self):
+        return self._value is not self._UNSET
+
+    def reset(self):
+        """Drop the value so the next call builds a new one"""
+        with self._lock:
+            self._value = self._UNSET
@@ -0,0 +1,222 @@
+"""
+Structured, non-blocking logging.
+
+Application code logs through the standard logging module with %-style
+arguments. Records are stamped with the current request ID, sampled, and put
+on a queue; a background listener formats them as JSON lines and writes
+them out, so a request thread never waits on stdout.
+
+Sampling keeps high-frequency messages (quota skips, mock-data fallbacks,
+retries) from flooding the output: each INFO or WARNING message template is
+logged at most LOG_SAMPLE_BURST times per LOG_SAMPLE_WINDOW seconds, and the
+next one logged afterwards reports how many were dropped. DEBUG records
+are not sampled.
+
+Environment: LOG_LEVEL (INFO), LOG_FORMAT (json or text),
+LOG_SAMPLE_BURST (10), LOG_SAMPLE_WINDOW (60), SLOW_REQUEST_SECONDS (2).
+"""
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_SAMPLE_BURST = int(os.environ.get('LOG_SAMPLE_BURST', 10))  # Records per template per window
+LOG_SAMPLE_WINDOW = float(os.environ.get('LOG_SAMPLE_WINDOW', 60))  # Seconds
+LOG_QUEUE_SIZE = 10000  # Records buffered for the writer; beyond that new records are dropped
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 2))  # Requests logged as slow
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'request_id', 'suppressed'}
+
+logger = logging.getLogger(__name__)
+
+
+def current_request_id():
+    """ID of the request being handled by this thread, or None outside a request"""
+    if has_request_context():
+        return g.get('request_id')
+    return None
+
+
+class SamplingFilter(logging.Filter):
+    """Let through at most `burst` records per message template per window"""
+
+    def __init__(self, burst=LOG_SAMPLE_BURST, window=LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._windows = {}  # (logger, template) -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        # Errors always get through, and DEBUG output is only on when every record is wanted
+        if record.levelno >= logging.ERROR or record.levelno < logging.INFO or self.burst <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._windows) > 10000:
+                    self._windows.clear()  # Bound memory if templates are built dynamically
+                suppressed = state[2] if state else 0
+                state = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if state[1] >= self.burst:
+                state[2] += 1
+                return False
+            state[1] += 1
+            return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the level, logger, request ID and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        if getattr(record, 'suppressed', None):
+            entry['suppressed'] = record.suppressed
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        record.request_id = getattr(record, 'request_id', None) or '-'
+        line = super().format(record)
+        if getattr(record, 'suppressed', None):
+            line += f" ({record.suppressed} similar messages suppressed)"
+        return line
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Queue records for a listener thread, starting one in each process that logs.
+
+    Under a preloading server the master configures logging before forking;
+    the listener thread does not survive the fork, so every worker starts its
+    own on its first record.
+    """
+
+    def __init__(self, handler, queue_size=LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(queue_size))
+        self.handler = handler
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue.maxsize)  # Discard records copied from the parent
+            self._listener = logging.handlers.QueueListener(self.queue, self.handler)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def prepare(self, record):
+        # Only merge the arguments here; JSON formatting happens on the listener thread
+        record.request_id = getattr(record, 'request_id', None) or current_request_id()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Write out queued records; called at exit"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """Route the root logger through the queue; later calls are no-ops"""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(TextFormatter() if fmt == 'text' else JSONFormatter())
+        handler = AsyncQueueHandler(output)
+        handler.addFilter(SamplingFilter())
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel(level)
+        _configured = True
+
+
+def before_request():
+    # Reuse the caller's ID so logs can be joined across services, if it looks like one
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = request_id if _REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex[:16]
+    g.request_started = time.perf_counter()
+
+
+def after_request(response):
+    response.headers[REQUEST_ID_HEADER] = g.get('request_id', '')
+    started = g.get('request_started')
+    if started is not None:
+        duration = time.perf_counter() - started
+        if duration >= SLOW_REQUEST_SECONDS:
+            logger.warning("Slow request %s %s", request.method, request.path, extra={
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 1)
+            })
+    return response
+
+
+def init_app(app):
+    """Configure logging and give every request an ID, returned in the X-Request-ID header"""
+    configure_logging()
+    app.before_request(before_request)
+    app.after_request(after_request)
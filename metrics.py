@@ -0,0 +1,306 @@
+"""
+Request and upstream metrics in the Prometheus text format.
+
+Counters and histograms are plain dicts behind a lock, so recording a value
+costs a few microseconds and the metrics can stay on in production. Routes
+are timed by hooks installed with init_app, upstream calls are timed in
+http_client, and caches and retries count themselves at their call sites.
+
+With several worker processes, set METRICS_DIR to a directory the workers
+share (the gunicorn profile does). Each worker then writes its totals there
+every few seconds and /metrics sums all of them, including workers that have
+since exited, so counters never go backwards when a worker is recycled.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import Response, request
+
+METRICS_DIR = os.environ.get('METRICS_DIR')  # Shared by worker processes; unset for a single process
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Optional bearer token required to scrape /metrics
+FLUSH_INTERVAL = 5  # Seconds between writes of this worker's totals to METRICS_DIR
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+logger = logging.getLogger(__name__)
+
+
+class Counter:
+    """Monotonic counter per combination of label values"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        return total + value
+
+    def samples(self, labels, value):
+        yield self.name, labels, value
+
+
+class Histogram:
+    """Bucketed observations per combination of label values"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [count per bucket..., count above the last bucket, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), list(counts)] for labels, counts in self._values.items()]
+
+    @staticmethod
+    def merge(total, counts):
+        return [a + b for a, b in zip(total, counts)]
+
+    def samples(self, labels, counts):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            yield f'{self.name}_bucket', labels + (('le', format_value(bound)),), cumulative
+        yield f'{self.name}_sum', labels, counts[-1]
+        yield f'{self.name}_count', labels, cumulative
+
+
+REGISTRY = {}
+
+
+def register(metric):
+    REGISTRY[metric.name] = metric
+    return metric
+
+
+HTTP_REQUESTS = register(Counter(
+    'http_requests_total', 'Requests served, by route and status', ('method', 'endpoint', 'status')
+))
+HTTP_LATENCY = register(Histogram(
+    'http_request_duration_seconds',
+    'Time to produce a response; for streams, the time until the stream starts', ('endpoint',)
+))
+HTTP_RESPONSE_SIZE = register(Histogram(
+    'http_response_size_bytes', 'Response body size, for responses of known length', ('endpoint',),
+    buckets=SIZE_BUCKETS
+))
+UPSTREAM_REQUESTS = register(Counter(
+    'upstream_requests_total', 'Upstream API calls, by status code or "timeout"/"error"',
+    ('upstream', 'operation', 'status')
+))
+UPSTREAM_LATENCY = register(Histogram(
+    'upstream_request_duration_seconds', 'Upstream API call time until the response headers',
+    ('upstream', 'operation')
+))
+UPSTREAM_REQUEST_SIZE = register(Histogram(
+    'upstream_request_size_bytes', 'Upstream API request body size', ('upstream', 'operation'),
+    buckets=SIZE_BUCKETS
+))
+UPSTREAM_RESPONSE_SIZE = register(Histogram(
+    'upstream_response_size_bytes', 'Upstream API response body size, for non-streamed calls',
+    ('upstream', 'operation'), buckets=SIZE_BUCKETS
+))
+UPSTREAM_RETRIES = register(Counter(
+    'upstream_retries_total', 'Retries of failed upstream calls', ('operation',)
+))
+CACHE_LOOKUPS = register(Counter(
+    'cache_lookups_total', 'Cache lookups, by result (fresh, stale, hit or miss)', ('cache', 'result')
+))
+
+
+@contextmanager
+def time_upstream(upstream, operation):
+    """Time an upstream call made outside http_client, e.g. through an SDK"""
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        yield
+        status = 'ok'
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started, upstream, operation)
+        UPSTREAM_REQUESTS.inc(upstream, operation, status)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def snapshot():
+    """This process's totals as JSON-serializable data"""
+    return {name: metric.snapshot() for name, metric in REGISTRY.items()}
+
+
+def snapshot_path():
+    return os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+
+
+def flush():
+    """Write this process's totals to METRICS_DIR, replacing its previous file"""
+    path = snapshot_path()
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f)
+    os.replace(temp_path, path)
+
+
+def collect():
+    """Totals summed over every worker that wrote to METRICS_DIR, plus this process's live ones"""
+    snapshots = [snapshot()]
+    if METRICS_DIR:
+        own_path = snapshot_path()
+        for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+            if path == own_path:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Removed since the directory was listed
+
+    totals = {name: {} for name in REGISTRY}
+    for data in snapshots:
+        for name, series in data.items():
+            metric = REGISTRY.get(name)
+            if metric is None:
+                continue
+            for labels, value in series:
+                labels = tuple(labels)
+                total = totals[name].get(labels)
+                totals[name][labels] = value if total is None else metric.merge(total, value)
+    return totals
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for name, series in collect().items():
+        metric = REGISTRY[name]
+        lines.append(f'# HELP {name} {escape(metric.documentation)}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for labels, value in sorted(series.items()):
+            for sample_name, sample_labels, sample_value in metric.samples(
+                    tuple(zip(metric.labelnames, labels)), value):
+                label_text = ','.join(f'{key}="{escape(val)}"' for key, val in sample_labels)
+                lines.append(f'{sample_name}{{{label_text}}} {format_value(sample_value)}'
+                             if label_text else f'{sample_name} {format_value(sample_value)}')
+    return '\n'.join(lines) + '\n'
+
+
+class Flusher:
+    """Background thread writing this worker's totals to METRICS_DIR"""
+
+    def __init__(self, interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        # Started from the first request rather than at import, so a preloading master never
+        # runs it and each forked worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='metrics-flush', daemon=True).start()
+            atexit.register(self._flush)
+
+    def _flush(self):
+        try:
+            flush()
+        except OSError as e:
+            logger.warning("Failed to write metrics: %s", e)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self._flush()
+
+
+flusher = Flusher()
+
+
+def before_request():
+    request.environ['metrics.started'] = time.perf_counter()
+    if METRICS_DIR:
+        flusher.ensure_started()
+
+
+def after_request(response):
+    started = request.environ.get('metrics.started')
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - started, endpoint)
+        HTTP_REQUESTS.inc(request.method, endpoint, str(response.status_code))
+        if response.content_length is not None:
+            HTTP_RESPONSE_SIZE.observe(response.content_length, endpoint)
+    return response
+
+
+def metrics_view():
+    """Serve all metrics to a Prometheus scraper"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render(), content_type=CONTENT_TYPE)
+
+
+def init_app(app):
+    """Time every request; call before other extensions so their hooks are timed too"""
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+    app.before_request(before_request)
+    app.after_request(after_request)
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket that meters calls against an upstream quota"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # Tokens added per second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.denied = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; never blocks"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.granted += 1
+                return True
+            self.denied += 1
+            return False
+
+    def available(self):
+        """Whole tokens that could be taken right now"""
+        with self._lock:
+            self._refill()
+            return int(self._tokens)
+
+    def stats(self):
+        with self._lock:
+            self._refill()
+            return {
+                'tokens': round(self._tokens, 2),
+                'capacity': self.capacity,
+                'rate_per_minute': self.rate * 60,
+                'granted': self.granted,
+                'denied': self.denied
+            }
+
+
+class SharedTokenBucket:
+    """Token bucket kept in a shared_state store, so all workers draw on one quota.
+
+    Refills like TokenBucket; the store updates the tokens and the refill
+    time in one atomic step.
+    """
+
+    def __init__(self, store, name, rate, capacity):
+        self.store = store
+        self.key = f"bucket:{name}"
+        self.rate = rate  # Tokens added per second
+        self.capacity = capacity
+        self.granted = 0  # Calls this process was granted or denied
+        self.denied = 0
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; never blocks"""
+        granted, _ = self.store.take_tokens(self.key, tokens, self.rate, self.capacity)
+        if granted:
+            self.granted += 1
+            return True
+        self.denied += 1
+        return False
+
+    def _level(self):
+        return self.store.take_tokens(self.key, 0, self.rate, self.capacity)[1]
+
+    def available(self):
+        """Whole tokens that could be taken right now"""
+        return int(self._level())
+
+    def stats(self):
+        return {
+            'tokens': round(self._level(), 2),
+            'capacity': self.capacity,
+            'rate_per_minute': self.rate * 60,
+            'granted': self.granted,
+            'denied': self.denied
+        }
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(api_key, calls_per_minute, store=None):
+    """Return the bucket metering one API key, creating it on first use.
+
+    With a shared store the quota is counted across every worker using it.
+    """
+    # Buckets are keyed by a digest so API keys never appear in stats or logs
+    name = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:12]
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            if store is not None and store.shared:
+                bucket = SharedTokenBucket(store, name, rate=calls_per_minute / 60.0, capacity=calls_per_minute)
+            else:
+                bucket = TokenBucket(rate=calls_per_minute / 60.0, capacity=calls_per_minute)
+            _buckets[name] = bucket
+        return bucket
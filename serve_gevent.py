@@ -0,0 +1,32 @@
+"""
+Run the application on a gevent WSGI server.
+
+Requests to /engagement/* and /support/chat spend nearly all of their time
+waiting on Gemini. With gevent's monkey patching that wait is cooperative,
+so a single process can keep hundreds of upstream calls in flight instead
+of one per worker thread.
+
+Usage: python serve_gevent.py
+"""
+from gevent import monkey
+
+# Patch sockets, ssl, threading and time.sleep before anything imports them
+monkey.patch_all()
+
+import os
+
+# The Gemini SDK defaults to gRPC, which does not cooperate with gevent
+os.environ.setdefault('GEMINI_TRANSPORT', 'rest')
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from app import create_app
+
+HOST = os.getenv('HOST', '127.0.0.1')
+PORT = int(os.getenv('PORT', 5000))
+MAX_CONNECTIONS = int(os.getenv('GEVENT_MAX_CONNECTIONS', 1000))  # Concurrent requests per process
+
+if __name__ == '__main__':
+    server = WSGIServer((HOST, PORT), create_app(), spawn=Pool(MAX_CONNECTIONS))
+    print(f"Serving on http://{HOST}:{PORT} with up to {MAX_CONNECTIONS} concurrent requests")
+    server.serve_forever()
@@ -0,0 +1,378 @@
+"""
+Shared state backends for rate-limit counters and caches.
+
+Every backend implements the same small, Redis-like interface: get, get_many,
+set, delete, incr, take_tokens, expires_at and clear, with JSON-serializable
+values and optional per-key TTLs. MemoryStore keeps state in the current process,
+SQLiteStore shares it between worker processes on one host, and RedisStore
+shares it between hosts through any server speaking the Redis protocol.
+
+The backend is chosen with SHARED_STATE_URL: memory:// (default),
+sqlite:///path/to/state.db or redis://host:port/db.
+"""
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from limits.storage import Storage
+
+try:
+    import redis
+except ImportError:  # Only needed for redis:// URLs
+    redis = None
+
+SHARED_STATE_URL = os.environ.get('SHARED_STATE_URL', 'memory://')
+PRUNE_EVERY = 1000  # Writes between sweeps of expired keys
+
+
+def _take_tokens(state, now, tokens, rate, capacity):
+    """Refill a [tokens, updated_at] bucket to now and take tokens if enough are left.
+
+    A missing state is a full bucket. Returns (tokens left, granted).
+    """
+    if state is None:
+        level = float(capacity)
+    else:
+        level = min(capacity, state[0] + max(0.0, now - state[1]) * rate)
+    if level >= tokens:
+        return level - tokens, True
+    return level, False
+
+
+class MemoryStore:
+    """Per-process store; each worker keeps its own state"""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _written(self, now):
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            for key in [key for key, (_, expires_at) in self._data.items()
+                        if expires_at is not None and expires_at <= now]:
+                del self._data[key]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.time())
+            return entry[0] if entry else None
+
+    def get_many(self, keys):
+        now = time.time()
+        with self._lock:
+            entries = {key: self._live(key, now) for key in keys}
+        return {key: entry[0] for key, entry in entries.items() if entry}
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._data[key] = (value, now + ttl if ttl else None)
+            self._written(now)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        """Add to a counter; a new counter starts its TTL, which later increments keep"""
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                entry = (0, now + ttl if ttl else None)
+            value = entry[0] + amount
+            self._data[key] = (value, entry[1])
+            self._written(now)
+            return value
+
+    def take_tokens(self, key, tokens, rate, capacity):
+        """Take tokens from the token bucket stored under key; returns (granted, tokens left)"""
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            level, granted = _take_tokens(entry[0] if entry else None, now, tokens, rate, capacity)
+            # Once the TTL passes the bucket would be full again, which a missing key means anyway
+            self._data[key] = ([level, now], now + capacity / rate)
+            self._written(now)
+        return granted, level
+
+    def expires_at(self, key):
+        with self._lock:
+            entry = self._live(key, time.time())
+            return entry[1] if entry else None
+
+    def clear(self, prefix=''):
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+
+class SQLiteStore:
+    """Store in a SQLite file, shared by worker processes on the same host"""
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS kv ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at)')
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation is safe across threads and forked workers
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _written(self, conn, now):
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM kv WHERE expires_at <= ?', (now,))
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        values = {}
+        with self._connect() as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f'SELECT key, value FROM kv WHERE key IN ({",".join("?" * len(chunk))}) '
+                    'AND (expires_at IS NULL OR expires_at > ?)',
+                    chunk + [time.time()]
+                ).fetchall()
+                values.update((key, json.loads(value)) for key, value in rows)
+        return values
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), now + ttl if ttl else None)
+            )
+            self._written(conn, now)
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def incr(self, key, amount=1, ttl=None):
+        """Add to a counter atomically across processes; an expired counter starts over"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'value = CASE WHEN kv.expires_at <= ? THEN excluded.value ELSE kv.value + ? END, '
+                'expires_at = CASE WHEN kv.expires_at <= ? THEN excluded.expires_at ELSE kv.expires_at END '
+                'RETURNING value',
+                (key, amount, now + ttl if ttl else None, now, amount, now)
+            ).fetchone()
+            self._written(conn, now)
+        return int(row[0])
+
+    def take_tokens(self, key, tokens, rate, capacity):
+        """Take tokens from the token bucket stored under key, atomically across processes"""
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock before reading, so no other worker updates the bucket in between
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (key, now)
+            ).fetchone()
+            level, granted = _take_tokens(json.loads(row[0]) if row else None, now, tokens, rate, capacity)
+            conn.execute(
+                'INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps([level, now]), now + capacity / rate)
+            )
+            self._written(conn, now)
+        return granted, level
+
+    def expires_at(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT expires_at FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def clear(self, prefix=''):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+class RedisStore:
+    """Store on a Redis-protocol server, shared by every host using it"""
+
+    shared = True
+
+    # Set the TTL in the same step as the increment that creates the counter; with two
+    # calls, a failure in between would leave a counter that never expires
+    INCR_SCRIPT = """
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value == tonumber(ARGV[1]) and tonumber(ARGV[2]) > 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return value
+"""
+
+    # Same refill as _take_tokens, run on the server so the read and the write are one step.
+    # The server's clock is used, so hosts with skewed clocks still agree; the level is
+    # returned as a string because Lua numbers come back to Redis clients truncated
+    TAKE_TOKENS_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens, rate, capacity = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local level = capacity
+local state = redis.call('GET', KEYS[1])
+if state then
+    state = cjson.decode(state)
+    level = math.min(capacity, state[1] + math.max(0, now - state[2]) * rate)
+end
+local granted = 0
+if level >= tokens then
+    level = level - tokens
+    granted = 1
+end
+redis.call('SET', KEYS[1], cjson.encode({level, now}), 'PX', math.ceil(capacity / rate * 1000))
+return {granted, tostring(level)}
+"""
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            if redis is None:
+                raise ImportError("The redis package is required for redis:// shared state")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._incr = client.register_script(self.INCR_SCRIPT)
+        self._take_tokens = client.register_script(self.TAKE_TOKENS_SCRIPT)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget(keys)
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key, amount=1, ttl=None):
+        return int(self._incr(keys=[key], args=[amount, int(ttl * 1000) if ttl else 0]))
+
+    def take_tokens(self, key, tokens, rate, capacity):
+        granted, level = self._take_tokens(keys=[key], args=[tokens, rate, capacity])
+        return bool(granted), float(level)
+
+    def expires_at(self, key):
+        remaining = self.client.pttl(key)
+        return time.time() + remaining / 1000 if remaining > 0 else None
+
+    def clear(self, prefix=''):
+        keys = list(self.client.scan_iter(match=f'{prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def open_store(url):
+    """Create the store for a memory://, sqlite:/// or redis:// URL"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        return MemoryStore()
+    if parsed.scheme == 'sqlite':
+        return SQLiteStore(url[len('sqlite:///'):] if url.startswith('sqlite:///') else parsed.path)
+    if parsed.scheme in ('redis', 'rediss', 'unix'):
+        return RedisStore(url)
+    raise ValueError(f"Unsupported shared state URL: {url}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the store configured by SHARED_STATE_URL, opening it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_store(SHARED_STATE_URL)
+        return _store
+
+
+class LimiterStorage(Storage):
+    """flask-limiter counter storage on a SQLite shared store (fixed-window strategy).
+
+    memory:// and redis:// URLs use the limits package's own storages.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        self.store = open_store(uri)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        return self.store.incr(f'limit:{key}', amount, ttl=expiry)
+
+    def get(self, key):
+        return self.store.get(f'limit:{key}') or 0
+
+    def get_expiry(self, key):
+        return self.store.expires_at(f'limit:{key}') or time.time()
+
+    def check(self):
+        try:
+            self.store.get('limit:check')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        self.store.clear('limit:')
+
+    def clear(self, key):
+        self.store.delete(f'limit:{key}')
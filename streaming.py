@@ -0,0 +1,44 @@
+from flask import Response, request
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Headers that keep proxies from buffering or caching event streams
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+
+def format_sse(event, data):
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def wants_event_stream():
+    """Whether the client asked for a text/event-stream response"""
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def event_stream_response(generator):
+    """Wrap a generator of SSE messages in a streaming response"""
+    return Response(generator, mimetype='text/event-stream', headers=STREAM_HEADERS)
+
+
+def stream_text_response(chunks, on_complete=None):
+    """Relay text chunks as 'chunk' events, then a 'done' event built from the full text"""
+    def generate():
+        parts = []
+        try:
+            for text in chunks:
+                parts.append(text)
+                yield format_sse('chunk', {'text': text})
+            data = on_complete(''.join(parts)) if on_complete else None
+            yield format_sse('done', data or {})
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            logger.exception("Streaming response failed: %s", e)
+            yield format_sse('error', {'message': str(e)})
+
+    return event_stream_response(generate())
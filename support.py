@@ -7,69 +7,81 @@ Created on Wed Feb  5 17:28:47 2025
 """
 from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required
-import json
+import logging
 import os
-import signal
-import psutil
 from datetime import datetime
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from streaming import wants_event_stream, stream_text_response
+from history_store import HistoryStore
+from chat_sessions import ChatSessionManager, conversation_key
+from lazy import Lazy
+from shared_state import get_store
+import metrics
 
 support_bp = Blueprint('support_bp', __name__)
+logger = logging.getLogger(__name__)
 
 # Configure Google Gemini
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')  # Overrides the SDK's API host, e.g. for local stubs
 if not GEMINI_API_KEY:
-    print("Error: GEMINI_API_KEY environment variable not set")
-else:
-    genai.configure(api_key=GEMINI_API_KEY)
-    # Create Gemini model instance
-    model = genai.GenerativeModel('gemini-pro')
+    logger.error("GEMINI_API_KEY environment variable not set")
+
+def create_gemini_model():
+    """Import and configure the Gemini SDK; it takes about a second, so only on first chat"""
+    import google.generativeai as genai
+    # GEMINI_TRANSPORT=rest keeps SDK calls on plain HTTP, which gevent can make cooperative
+    client_options = {'api_endpoint': GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None
+    genai.configure(api_key=GEMINI_API_KEY, transport=os.getenv('GEMINI_TRANSPORT'), client_options=client_options)
+    return genai.GenerativeModel('gemini-pro')
+
+model = Lazy(create_gemini_model)
 
 # Configure file path
-HISTORY_FILE = "question_history.json"
+HISTORY_FILE = "question_history.jsonl"
+LEGACY_HISTORY_FILE = "question_history.json"  # Migrated into HISTORY_FILE on first start
 
-def load_history():
-    """Load history from file"""
-    try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
-    except Exception as e:
-        print(f"Failed to load history: {str(e)}")
-        return []
+CHAT_MAX_TOKENS = 2000  # Token budget for the conversation window sent with each message
+CHAT_IDLE_TIMEOUT = 1800  # Seconds before an idle conversation is dropped
+
+HISTORY_PAGE_SIZE = 50  # Default number of history items per page
+MAX_HISTORY_PAGE_SIZE = 200  # Largest page a client may request
 
-def save_history(history):
-    """Save history to file"""
+# Per-user conversation windows, shared by all workers when the state backend is; each
+# request sends its window through a fresh Gemini chat
+chat_sessions = ChatSessionManager(max_tokens=CHAT_MAX_TOKENS, idle_ttl=CHAT_IDLE_TIMEOUT, store=get_store)
+
+# Append-only history shared by all workers, opened (and migrated) on first use
+history_store = Lazy(lambda: HistoryStore(HISTORY_FILE, legacy_path=LEGACY_HISTORY_FILE))
+
+def load_history(since=None, before=None, limit=HISTORY_PAGE_SIZE):
+    """Load a page of history: items after `since`, items before `before`, or the latest items"""
     try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-        return True
+        if since is not None:
+            return history_store().read(since + 1, limit)
+        end = history_store().count() if before is None else max(0, before)
+        start = max(0, end - limit)
+        return history_store().read(start, end - start)
     except Exception as e:
-        print(f"Failed to save history: {str(e)}")
-        return False
+        logger.warning("Failed to load history: %s", e)
+        return []
 
-def release_port(port=5102):
-    """Release specified port to prevent 'Address Already in Use' error"""
+def history_delta(new_item, since=None):
+    """History items a chat client hasn't seen yet, instead of the whole history"""
+    if since is not None:
+        return load_history(since=since, limit=MAX_HISTORY_PAGE_SIZE)
+    return [new_item] if new_item else []
+
+def record_question(question):
+    """Append a question to the history and persist it"""
+    new_history_item = {
+        "question": question,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                if proc.info['cmdline'] and any("flask" in cmd for cmd in proc.info['cmdline']):
-                    os.kill(proc.info['pid'], signal.SIGKILL)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        return history_store().append(new_history_item)
     except Exception as e:
-        print(f"Failed to release port: {str(e)}")
-
-# Release port before starting
-release_port(5102)
-
-# Load history
-question_history = load_history()
+        logger.warning("Failed to save history: %s", e)
+        return None
 
 # System prompt
 SYSTEM_PROMPT = """You are a professional customer service assistant responsible for answering questions about company services. Please note:
@@ -97,10 +109,19 @@ def index():
 @support_bp.route("/get_history")
 @login_required
 def get_history():
-    """Get chat history"""
+    """Get a page of chat history using ?since / ?before id cursors and ?limit"""
     try:
-        history = load_history()
-        return jsonify({"success": True, "history": history})
+        since = request.args.get("since", type=int)
+        before = request.args.get("before", type=int)
+        limit = request.args.get("limit", HISTORY_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+
+        history = load_history(since=since, before=before, limit=limit)
+        if since is not None:
+            has_more = bool(history) and history[-1]["id"] < history_store().count() - 1
+        else:
+            has_more = bool(history) and history[0]["id"] > 0
+        return jsonify({"success": True, "history": history, "has_more": has_more})
     except Exception as e:
         return jsonify({
             "success": False,
@@ -126,6 +147,12 @@ def chat():
             }), 400
 
         user_message = data['message'].strip()
+        history_since = data.get('history_since')
+        if history_since is not None:
+            try:
+                history_since = int(history_since)
+            except (TypeError, ValueError):
+                history_since = None
         if not user_message:
             return jsonify({
                 "success": False,
@@ -139,28 +166,41 @@ def chat():
             }), 500
 
         try:
-            # Create chat context
-            chat = model.start_chat(history=[])
-            # Send system prompt and user message
-            response = chat.send_message(f"{SYSTEM_PROMPT}\n\nUser Question: {user_message}")
+            # Send the system prompt and a bounded window of this user's conversation. Each
+            # request gets its own chat object, since the SDK's is not safe to share between
+            # concurrent requests; creating one is cheap and makes no API call
+            conversation = chat_sessions.get(conversation_key('support'))
+            chat = model().start_chat(history=conversation.contents(preamble=SYSTEM_PROMPT))
+
+            if wants_event_stream():
+                # Relay the reply as it is generated and record the question once it completes
+                with metrics.time_upstream('gemini', 'chat_stream'):
+                    response = chat.send_message(user_message, stream=True)
+
+                def complete_reply(bot_reply):
+                    chat_sessions.record(conversation, user_message, bot_reply)
+                    new_item = record_question(user_message)
+                    return {"history": history_delta(new_item, history_since)}
+
+                return stream_text_response((chunk.text for chunk in response), on_complete=complete_reply)
+
+            # Send user message
+            with metrics.time_upstream('gemini', 'chat'):
+                response = chat.send_message(user_message)
             bot_reply = response.text
+            chat_sessions.record(conversation, user_message, bot_reply)
 
             # Record question
-            new_history_item = {
-                "question": user_message,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            question_history.append(new_history_item)
-            save_history(question_history)
+            new_item = record_question(user_message)
 
             return jsonify({
                 "success": True,
                 "response": bot_reply,
-                "history": question_history
+                "history": history_delta(new_item, history_since)
             })
 
         except Exception as e:
-            print(f"Gemini API Error: {str(e)}")
+            logger.exception("Gemini API Error: %s", e)
             return jsonify({
                 "success": False,
                 "error": f"AI response generation failed: {str(e)}"
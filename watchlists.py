@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+import os
+import re
+import sqlite3
+
+MAX_WATCHLIST_SIZE = 500  # Symbols per user
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9][A-Z0-9.\-]{0,14}$')
+
+
+def normalize_symbols(symbols):
+    """Upper-case, validate and deduplicate symbols, keeping their order"""
+    if not isinstance(symbols, list):
+        raise ValueError("Symbols must be a list")
+    normalized = []
+    for symbol in symbols:
+        symbol = str(symbol).strip().upper()
+        if not SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol}")
+        normalized.append(symbol)
+    normalized = list(dict.fromkeys(normalized))
+    if len(normalized) > MAX_WATCHLIST_SIZE:
+        raise ValueError(f"Watchlists are limited to {MAX_WATCHLIST_SIZE} symbols")
+    return normalized
+
+
+class WatchlistStore:
+    """Per-user symbol lists in SQLite, shared by every worker on the host"""
+
+    def __init__(self, path, default_symbols=()):
+        self.path = path
+        self.default_symbols = list(default_symbols)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS watchlist ('
+                'user_id TEXT NOT NULL, symbol TEXT NOT NULL, position INTEGER NOT NULL, '
+                'PRIMARY KEY (user_id, symbol))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS watchlist_symbol ON watchlist (symbol)')
+            # Users with an explicitly saved list, including an empty one
+            conn.execute('CREATE TABLE IF NOT EXISTS watchlist_owner (user_id TEXT PRIMARY KEY)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _symbols(conn, user_id):
+        rows = conn.execute(
+            'SELECT symbol FROM watchlist WHERE user_id = ? ORDER BY position', (user_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _own(self, conn, user_id):
+        """Give a user who never saved a list their own copy of the defaults, to edit in place"""
+        if conn.execute('INSERT OR IGNORE INTO watchlist_owner (user_id) VALUES (?)', (user_id,)).rowcount:
+            conn.executemany(
+                'INSERT OR IGNORE INTO watchlist (user_id, symbol, position) VALUES (?, ?, ?)',
+                [(user_id, symbol, position) for position, symbol in enumerate(self.default_symbols)]
+            )
+
+    def get(self, user_id):
+        """Return a user's symbols, or the default list if they never saved one"""
+        with self._connect() as conn:
+            symbols = self._symbols(conn, str(user_id))
+            if not symbols and not conn.execute(
+                'SELECT 1 FROM watchlist_owner WHERE user_id = ?', (str(user_id),)
+            ).fetchone():
+                return list(self.default_symbols)
+        return symbols
+
+    def set(self, user_id, symbols):
+        """Replace a user's symbols"""
+        symbols = normalize_symbols(symbols)
+        with self._connect() as conn:
+            conn.execute('DELETE FROM watchlist WHERE user_id = ?', (str(user_id),))
+            conn.executemany(
+                'INSERT INTO watchlist (user_id, symbol, position) VALUES (?, ?, ?)',
+                [(str(user_id), symbol, position) for position, symbol in enumerate(symbols)]
+            )
+            conn.execute('INSERT OR IGNORE INTO watchlist_owner (user_id) VALUES (?)', (str(user_id),))
+        return symbols
+
+    def add(self, user_id, symbol):
+        """Append a symbol to a user's list, unless it is already there"""
+        symbol = normalize_symbols([symbol])[0]
+        user_id = str(user_id)
+        with self._connect() as conn:
+            # Hold the write lock from the first read, so concurrent edits apply one after another
+            conn.execute('BEGIN IMMEDIATE')
+            self._own(conn, user_id)
+            count, present = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(symbol = ?), 0) FROM watchlist WHERE user_id = ?',
+                (symbol, user_id)
+            ).fetchone()
+            if not present and count >= MAX_WATCHLIST_SIZE:
+                raise ValueError(f"Watchlists are limited to {MAX_WATCHLIST_SIZE} symbols")
+            conn.execute(
+                'INSERT OR IGNORE INTO watchlist (user_id, symbol, position) '
+                'SELECT ?, ?, COALESCE(MAX(position) + 1, 0) FROM watchlist WHERE user_id = ?',
+                (user_id, symbol, user_id)
+            )
+            return self._symbols(conn, user_id)
+
+    def remove(self, user_id, symbol):
+        """Drop a symbol from a user's list"""
+        symbol = str(symbol).strip().upper()
+        user_id = str(user_id)
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._own(conn, user_id)
+            conn.execute('DELETE FROM watchlist WHERE user_id = ? AND symbol = ?', (user_id, symbol))
+            return self._symbols(conn, user_id)
+
+    def all_symbols(self):
+        """Every symbol watched by anyone, each listed once, plus the defaults"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT DISTINCT symbol FROM watchlist').fetchall()
+        return list(dict.fromkeys(self.default_symbols + [row[0] for row in rows]))
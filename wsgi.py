@@ -0,0 +1,14 @@
+"""
+WSGI entry point for production servers.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+import support
+
+app = create_app()
+
+# The gunicorn profile preloads this module in the master, so build the support chat model
+# here: forked workers inherit the imported SDK instead of each importing it on its first
+# chat. Building it opens no connections, so nothing is shared across the fork
+support.model()